@@ -130,6 +130,9 @@ m_da = [
     None
     ]
 
+# Creates the boundary matrix, assigning every space to a building boundary (floor or wing) of the DXF file, in the order the boundaries are read. This is an optional value, and every space is assigned to the first building boundary if it is missing.
+m_bnd = [0, 0, 0, 0, 0, 0, 0, 0, 0]
+
 # Specifies the interior and exterior wall thickness 
 t_iw = 0.08
 t_ew = 0.35
\ No newline at end of file
@@ -8,17 +8,29 @@
 
 import os
 import sys
+import copy
+import time
+import types
 import ezdxf
+import logging
+import numpy as np
 
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from ezdxf.addons import iterdxf
 from compas.geometry import Point, Polygon
 from compas_plotters import Plotter
 from compas.colors import Color
 from numpy.random import default_rng
 from space_classes import Boundary, Population, Individual, Space, Window, \
-    Door, Floor
+    Door, Floor, MM
 
+import fitness_functions as ff
+from trajectory_log import TrajectoryLog
 import design_data.first_validation_test as dd
 
+logger = logging.getLogger('epsap')
+
 def compute_population_size(k, elite_size, design_data):
     """
     Computes the size of the population based on the number of floor plan 
@@ -57,8 +69,18 @@ def create_boundaries(filepath):
     'adjacent'. The adjacent buildings can't have overlaps with the building 
     boundary.
     """
-    # Reads and parses the DXF file.
+    # Reads the DXF file and parses its contents
     dxf_file = ezdxf.readfile(filepath)
+
+    return read_boundaries(dxf_file)
+
+def read_boundaries(dxf_file):
+    """
+    Transforms the polylines of an already loaded DXF document to boundaries 
+    according to their layers. This is used by 'create_boundaries' and by 
+    callers that read the DXF from a stream instead of a file.
+    """
+    # Parses the DXF document
     building = dxf_file.query('LWPOLYLINE[layer=="building"]')
     adjacent = dxf_file.query('LWPOLYLINE[layer=="adjacent"]')
 
@@ -107,9 +129,94 @@ def create_boundaries(filepath):
 
     return dxf_contents
 
-def create_spaces(design_data, boundary):
+def stream_site(filepath, buffer=50.0):
+    """
+    Streams the LWPOLYLINE entities of the 'building' and 'adjacent' layers
+    from a DXF file, without loading the whole document in memory, and
+    returns their coordinates as (n, 2) NumPy arrays. Adjacent polylines that
+    are farther than the buffer distance from the building bounding rectangle
+    are discarded, which keeps large survey drawings cheap to import.
+    """
+    site = {'building': [], 'adjacent': []}
+    adjacent = []
+
+    # Reads the polylines of both layers from the modelspace
+    for polyline in iterdxf.modelspace(filepath, types=['LWPOLYLINE']):
+        layer = polyline.dxf.layer
+        if layer != 'building' and layer != 'adjacent':
+            continue
+
+        points = np.round(np.array(polyline.get_points('xy'), dtype=float), 3)
+        if layer == 'building':
+            site['building'].append(points)
+        else:
+            adjacent.append(points)
+
+    if len(site['building']) == 0:
+        sys.exit("DXF file is missing a polyline on the 'building' layer.")
+
+    # Computes the cropping rectangle around all building boundaries
+    building_points = np.concatenate(site['building'])
+    min_x, min_y = building_points.min(axis=0) - buffer
+    max_x, max_y = building_points.max(axis=0) + buffer
+
+    # Keeps the adjacent polylines whose bounding rectangle overlaps the
+    # cropping rectangle
+    for points in adjacent:
+        low = points.min(axis=0)
+        high = points.max(axis=0)
+        if low[0] <= max_x and high[0] >= min_x and \
+                low[1] <= max_y and high[1] >= min_y:
+            site['adjacent'].append(points)
+
+    return site
+
+def create_site_boundaries(site):
+    """
+    Transforms the coordinate arrays returned by 'stream_site' to boundaries,
+    in the same format returned by 'create_boundaries'.
+    """
+    dxf_contents = {'building': [], 'adjacent': []}
+
+    for key in dxf_contents.keys():
+        for points in site[key]:
+            polygon = Polygon([Point(x, y, 0.0) for x, y in points.tolist()])
+            dxf_contents[key].append(Boundary(polygon))
+
+    return dxf_contents
+
+def sample_value(rng, low, high, fixed_point=False):
+    """
+    Samples a uniform value between the low and high limits, given in meters.
+    The value is rounded to millimetres, or returned as an integer number of 
+    millimetres if the fixed-point mode is used.
+    """
+    if fixed_point == True:
+        return int(rng.integers(round(low * MM), round(high * MM), 
+                                endpoint=True))
+
+    return round(rng.uniform(low= low, high= high), 3)
+
+def create_floor(position, width, height, fixed_point=False):
+    """
+    Creates a floor from its position, width and height. In fixed-point mode 
+    the values are integer millimetres, which are kept as the floor grid and 
+    converted to meters for the floor geometry.
+    """
+    if fixed_point == True:
+        grid = np.array([position[0], position[1], width, height], 
+                        dtype=np.int32)
+        return Floor((position[0] / MM, position[1] / MM), width / MM,
+                     height / MM, grid)
+
+    return Floor(position, width, height)
+
+def create_spaces(design_data, boundary, fixed_point=False):
     """
     Creates a list of all spaces and its properties based on the design data.
+    The boundary can also be a list with the boundary of every space. If 
+    'fixed_point' is True, the floor positions and dimensions are sampled as 
+    integer millimetres.
     """    
     # Gets the list of spaces from the design data
     space_names = design_data.m_sn
@@ -126,16 +233,21 @@ def create_spaces(design_data, boundary):
         label = space_names[i]
 
         # Defines the floor (x,y) position within the boundary's bounding box
-        bounding_coordinates = [boundary.position[0],
-                                boundary.position[1],
-                                boundary.position[0] + boundary.width,
-                                boundary.position[1] + boundary.height
+        space_boundary = boundary
+        if type(boundary) == list:
+            space_boundary = boundary[i]
+        bounding_coordinates = [space_boundary.position[0],
+                                space_boundary.position[1],
+                                space_boundary.position[0] + 
+                                space_boundary.width,
+                                space_boundary.position[1] + 
+                                space_boundary.height
                                 ]
         
-        x_coord = round(rng.uniform(low= bounding_coordinates[0],
-                                    high= bounding_coordinates[2]), 3)
-        y_coord = round(rng.uniform(low= bounding_coordinates[1],
-                                    high= bounding_coordinates[3]), 3)
+        x_coord = sample_value(rng, bounding_coordinates[0],
+                               bounding_coordinates[2], fixed_point)
+        y_coord = sample_value(rng, bounding_coordinates[1],
+                               bounding_coordinates[3], fixed_point)
 
         # Defines the floor's width and height based on the design data.
         # A random coin is flipped to decide if the longest side is the
@@ -146,18 +258,18 @@ def create_spaces(design_data, boundary):
 
         coin_flip = rng.choice([True, False])
         if coin_flip == True:
-            width = round(rng.uniform(low= dimension_range[0],
-                                      high= dimension_range[1]), 3)
-            height = round(rng.uniform(low= dimension_range[2],
-                                       high= dimension_range[3]), 3)
+            width = sample_value(rng, dimension_range[0], dimension_range[1],
+                                 fixed_point)
+            height = sample_value(rng, dimension_range[2], dimension_range[3],
+                                  fixed_point)
         else:    
-            width = round(rng.uniform(low= dimension_range[2],
-                                      high= dimension_range[3]), 3)
-            height = round(rng.uniform(low= dimension_range[0],
-                                       high= dimension_range[1]), 3)
+            width = sample_value(rng, dimension_range[2], dimension_range[3],
+                                 fixed_point)
+            height = sample_value(rng, dimension_range[0], dimension_range[1],
+                                  fixed_point)
 
         # Creates the space floor based on the floor parameters
-        floor = Floor((x_coord, y_coord), width, height)
+        floor = create_floor((x_coord, y_coord), width, height, fixed_point)
 
         # Creates the space windows based on the windows parameters
         windows = []
@@ -208,23 +320,1031 @@ def create_spaces(design_data, boundary):
 
     return spaces
 
-def create_individual(label, design_data, boundaries, weights):
+def repair_spaces(spaces, boundaries, design_data):
+    """
+    Repairs the spaces of an individual before its evaluation. Every floor 
+    that is not inside the deflated building boundary is translated into the 
+    nearest boundary rectangle it fits in, and floors that slightly overlap 
+    are moved apart along the axis of the smallest penetration, as long as the 
+    move doesn't push them out of the boundary. The floor dimensions and the 
+    openings are kept. Returns a new list of spaces.
+    """
+    # Repairs every building boundary separately if the spaces are assigned
+    # to more than one
+    if has_subproblems(design_data, boundaries):
+        repaired = list(spaces)
+        for indices, sub_data, sub_boundaries in \
+                split_problem(design_data, boundaries).values():
+            sub_spaces = repair_spaces([spaces[i] for i in indices],
+                                       sub_boundaries, sub_data)
+            for i in range(len(indices)):
+                repaired[indices[i]] = sub_spaces[i]
+        return repaired
+
+    # Gets the rectangles of the deflated boundary, or its bounding rectangle
+    # if the boundary is not rectilinear
+    offset_distance = design_data.t_ew - (0.5 * design_data.t_iw)
+    deflated_boundary, rectangles = \
+        boundaries['building'][0].deflate(offset_distance)
+    if rectangles is None:
+        rectangles = np.array([deflated_boundary.bounds], dtype=float)
+
+    floors = np.array([
+        [x.position[0], x.position[1], x.width, x.height] for x in spaces
+        ], dtype=float)
+    inside = ff.rectilinear_overlap(floors, rectangles)
+
+    # Translates the floors that are not inside the boundary
+    for i in range(len(floors)):
+        x_coord, y_coord, width, height = floors[i]
+        if inside[i] >= width * height - 1e-9:
+            continue
+
+        # Finds the rectangle that needs the smallest move, preferring the
+        # rectangles that are large enough for the floor
+        best = None
+        for x_0, y_0, x_1, y_1 in rectangles:
+            fits = x_1 - x_0 >= width and y_1 - y_0 >= height
+            new_x = min([max([x_coord, x_0]), x_1 - width]) \
+                if x_1 - x_0 >= width else x_0
+            new_y = min([max([y_coord, y_0]), y_1 - height]) \
+                if y_1 - y_0 >= height else y_0
+            key = (not fits, abs(new_x - x_coord) + abs(new_y - y_coord))
+            if best is None or key < best[0]:
+                best = (key, new_x, new_y)
+
+        floors[i, 0] = best[1]
+        floors[i, 1] = best[2]
+
+    inside = ff.rectilinear_overlap(floors, rectangles)
+
+    # Moves apart the floors that overlap by less than half of their size
+    for i in range(len(floors)):
+        for j in range(i + 1, len(floors)):
+            r1 = floors[i]
+            r2 = floors[j]
+            dx = min([r1[0] + r1[2], r2[0] + r2[2]]) - max([r1[0], r2[0]])
+            dy = min([r1[1] + r1[3], r2[1] + r2[3]]) - max([r1[1], r2[1]])
+            if dx <= 0 or dy <= 0:
+                continue
+
+            # Moves the floor j along the axis with the smallest penetration, 
+            # away from the center of the floor i
+            moved = floors[j].copy()
+            if dx <= dy and dx <= 0.5 * min([floors[i, 2], floors[j, 2]]):
+                center_i = floors[i, 0] + 0.5 * floors[i, 2]
+                center_j = floors[j, 0] + 0.5 * floors[j, 2]
+                moved[0] += dx if center_j >= center_i else -dx
+            elif dy < dx and dy <= 0.5 * min([floors[i, 3], floors[j, 3]]):
+                center_i = floors[i, 1] + 0.5 * floors[i, 3]
+                center_j = floors[j, 1] + 0.5 * floors[j, 3]
+                moved[1] += dy if center_j >= center_i else -dy
+            else:
+                continue
+
+            # Keeps the move only if the floor doesn't leave the boundary
+            moved_inside = ff.rectilinear_overlap(moved, rectangles)
+            if moved_inside >= inside[j] - 1e-9:
+                floors[j] = moved
+                inside[j] = moved_inside
+
+    # Creates the repaired spaces, keeping the spaces that weren't moved
+    repaired = []
+    for i in range(len(spaces)):
+        space = spaces[i]
+        x_coord = round(float(floors[i, 0]), 3)
+        y_coord = round(float(floors[i, 1]), 3)
+        if x_coord == space.position[0] and y_coord == space.position[1]:
+            repaired.append(space)
+            continue
+
+        if space.grid is not None:
+            floor = create_floor((round(x_coord * MM), round(y_coord * MM)),
+                                 int(space.grid[2]), int(space.grid[3]), True)
+        else:
+            floor = Floor((x_coord, y_coord), space.width, space.height)
+        repaired.append(Space(space.label, floor, space.windows, space.doors,
+                              space.preferences))
+
+    return repaired
+
+def design_data_namespace(design_data):
+    """
+    Copies the design data matrices and wall thicknesses to a namespace, 
+    given that design data modules can't be sent to other processes.
+    """
+    namespace = types.SimpleNamespace(**{
+        key: value for key, value in vars(design_data).items()
+        if key.startswith('m_') or key.startswith('t_')
+        })
+
+    return namespace
+
+def boundary_assignment(design_data, boundaries):
+    """
+    Gets the index of the building boundary of every space from the optional 
+    'm_bnd' matrix of the design data. If the matrix is missing, every space 
+    is assigned to the first building boundary.
+    """
+    if hasattr(design_data, 'm_bnd') == False:
+        return [0] * len(design_data.m_sn)
+
+    if len(design_data.m_bnd) != len(design_data.m_sn):
+        sys.exit("The boundary matrix must have one boundary index for " \
+                 "every space.")
+
+    for index in design_data.m_bnd:
+        if index < 0 or index >= len(boundaries['building']):
+            sys.exit("Boundary index out of range, review the boundary " \
+                     "matrix and the building boundaries of the DXF file.")
+
+    return list(design_data.m_bnd)
+
+def has_subproblems(design_data, boundaries):
+    """
+    Checks if any space is assigned to a building boundary other than the 
+    first one, in which case the problem is split in sub-problems.
+    """
+    assignment = boundary_assignment(design_data, boundaries)
+
+    return any([index != 0 for index in assignment])
+
+def split_problem(design_data, boundaries):
+    """
+    Splits the problem in one sub-problem per building boundary used by the 
+    spaces. Returns a dictionary, keyed by boundary index, holding the indices 
+    of the spaces on that boundary, the design data of those spaces and the 
+    boundaries of the sub-problem. The connectivity matrix of a sub-problem 
+    only keeps the requirements among its own spaces.
+    """
+    assignment = boundary_assignment(design_data, boundaries)
+    matrices = vars(design_data_namespace(design_data))
+    subproblems = {}
+
+    for b in sorted(set(assignment)):
+        indices = [i for i in range(len(assignment)) if assignment[i] == b]
+
+        # Slices every space matrix to the spaces of the boundary
+        sub_data = types.SimpleNamespace()
+        for key, value in matrices.items():
+            if key == 'm_bnd':
+                continue
+            elif key == 'm_con':
+                value = [[value[i][j] for j in indices] for i in indices]
+            elif key.startswith('m_'):
+                value = [value[i] for i in indices]
+            setattr(sub_data, key, value)
+
+        sub_boundaries = {'building': [boundaries['building'][b]],
+                          'adjacent': boundaries['adjacent']}
+        subproblems[b] = (indices, sub_data, sub_boundaries)
+
+    return subproblems
+
+# Problem of the current worker process, as the design data, the boundaries
+# and the sub-problems of every building boundary
+_problem = None
+
+def init_evaluation_worker(design_data, boundaries):
+    """
+    Initializes a worker process of the executor created by 
+    'create_evaluation_executor', splitting the problem once so that only the
+    spaces are sent with every task.
+    """
+    global _problem
+    _problem = (design_data, boundaries, 
+                split_problem(design_data, boundaries))
+
+    return
+
+def create_evaluation_executor(design_data, boundaries, workers):
+    """
+    Creates the pool of worker processes used to evaluate batches of 
+    individuals in parallel.
+    """
+    executor = ProcessPoolExecutor(
+        max_workers=workers, initializer=init_evaluation_worker,
+        initargs=(design_data_namespace(design_data), boundaries)
+        )
+
+    return executor
+
+def evaluate_subproblem(spaces, subproblem, backend='reference'):
+    """
+    Computes the evaluator values of the spaces of a single building boundary,
+    before their square roots are taken (see 'compute_evaluator_values').
+    """
+    indices, sub_data, sub_boundaries = subproblem
+
+    individual = Individual(None, spaces)
+
+    return individual.compute_evaluator_values(sub_boundaries, sub_data,
+                                               backend)
+
+def compute_fitness(individual, design_data, boundaries, weights, 
+                    backend='reference', subproblems=None):
+    """
+    Computes the fitness value of an individual. If the spaces are assigned to
+    more than one building boundary, every boundary is evaluated as a 
+    sub-problem (see 'split_problem') and their evaluator values are summed
+    before the square roots and the weights are applied, so the fitness value
+    doesn't depend on how the spaces are split. The 
+    Connectivity/Adjacency Evaluator is computed over all spaces with the 
+    full design data instead, so it doesn't depend on how the spaces are 
+    split and includes the requirements between spaces of different 
+    boundaries. The evaluators are computed with the given backend (see 
+    'BACKENDS' in fitness_functions.py).
+    """
+    if has_subproblems(design_data, boundaries) == False:
+        individual.compute_fitness_value(boundaries, design_data, weights,
+                                         backend)
+        return
+
+    if subproblems is None:
+        subproblems = split_problem(design_data, boundaries)
+    spaces = individual.spaces
+
+    # Evaluates the sub-problem of every building boundary and sums their
+    # evaluator values
+    results = [
+        evaluate_subproblem([spaces[i] for i in x[0]], x, backend)
+        for x in subproblems.values()
+        ]
+    values = [sum(x) for x in zip(*results)]
+
+    # Computes the connectivity among all spaces
+    connectivity = ff.get_backend(backend)['connectivity_and_adjacency']
+    values[0] = connectivity(spaces, design_data)
+
+    individual.apply_evaluator_values(values, weights)
+
+    return
+
+def evaluate_individuals(spaces, weights, backend='reference'):
+    """
+    Computes the fitness values and the evaluators of a batch of individuals,
+    given by their spaces, on a worker process of the executor created by
+    'create_evaluation_executor'.
+    """
+    design_data, boundaries, subproblems = _problem
+
+    results = []
+    for x in spaces:
+        individual = Individual(None, x)
+        compute_fitness(individual, design_data, boundaries, weights, backend,
+                        subproblems)
+        results.append((individual.fitness_value, individual.evaluators))
+
+    return results
+
+def compute_fitness_batch(individuals, design_data, boundaries, weights,
+                          executor=None, backend='reference', batch_size=50,
+                          cancel=None):
+    """
+    Computes the fitness values of a list of individuals. If an executor 
+    created by 'create_evaluation_executor' is given, the individuals are 
+    evaluated in parallel, in batches of 'batch_size' individuals per task.
+    If the cancel event is set, the evaluation stops as soon as possible and
+    the remaining individuals are left without fitness values.
+    """
+    if executor is None:
+        subproblems = None
+        if has_subproblems(design_data, boundaries):
+            subproblems = split_problem(design_data, boundaries)
+
+        for individual in individuals:
+            if cancel is not None and cancel.is_set():
+                return
+            compute_fitness(individual, design_data, boundaries, weights,
+                            backend, subproblems)
+        return
+
+    futures = [
+        executor.submit(evaluate_individuals,
+                        [x.spaces for x in individuals[k:k + batch_size]],
+                        weights, backend)
+        for k in range(0, len(individuals), batch_size)
+        ]
+
+    # Copies the results back to the individuals
+    results = []
+    for future in futures:
+        if cancel is not None and cancel.is_set():
+            for x in futures:
+                x.cancel()
+            return
+        results.extend(future.result())
+
+    for individual, (fitness_value, evaluators) in zip(individuals, results):
+        individual.fitness_value = fitness_value
+        individual.evaluators = evaluators
+
+    return
+
+def create_shadow_report(fraction):
+    """
+    Creates an empty shadow report. A shadow report keeps, for every 
+    evaluator, the number of sampled evaluations, the maximum absolute 
+    difference between the 'reference' and 'fast' backends and the total time 
+    spent by each backend. A fraction of the evaluated individuals, given by
+    'fraction', is sampled.
+    """
+    report = {'fraction': fraction, 'evaluators': {}}
+    for name in ff.BACKENDS['reference'].keys():
+        report['evaluators'][name] = {'samples': 0, 'max_difference': 0.0,
+                                      'reference_time': 0.0, 'fast_time': 0.0}
+
+    return report
+
+def shadow_evaluate(individual, design_data, boundaries, report):
+    """
+    Evaluates the spaces of an individual with the evaluators of both the
+    'reference' and 'fast' backends, and adds the differences and timings to
+    the shadow report. The spaces of every building boundary are evaluated as
+    a separate sub-problem. The individual's fitness value is not changed.
+    """
+    if has_subproblems(design_data, boundaries) == False:
+        subproblems = [(list(range(len(individual.spaces))), design_data,
+                        boundaries)]
+    else:
+        subproblems = split_problem(design_data, boundaries).values()
+
+    for indices, sub_data, sub_boundaries in subproblems:
+        spaces = [individual.spaces[i] for i in indices]
+
+        for name, stats in report['evaluators'].items():
+            values = {}
+            for backend in ['reference', 'fast']:
+                evaluator = ff.BACKENDS[backend][name]
+                start_time = time.perf_counter()
+                if name == 'connectivity_and_adjacency' or \
+                   name == 'floor_dimensions':
+                    values[backend] = evaluator(spaces, sub_data)
+                elif name == 'overflow':
+                    values[backend] = evaluator(spaces, sub_boundaries,
+                                                sub_data)
+                else:
+                    values[backend] = evaluator(spaces, sub_boundaries)
+                stats[backend + '_time'] += time.perf_counter() - start_time
+
+            difference = abs(values['reference'] - values['fast'])
+            stats['max_difference'] = max([stats['max_difference'],
+                                           difference])
+            stats['samples'] += 1
+
+    return
+
+def summarize_shadow_report(report):
+    """
+    Summarizes a shadow report as the number of samples, the maximum absolute
+    difference and the speedup of the 'fast' backend for every evaluator.
+    """
+    summary = {}
+    for name, stats in report['evaluators'].items():
+        if stats['fast_time'] > 0:
+            speedup = stats['reference_time'] / stats['fast_time']
+        else:
+            speedup = None
+        summary[name] = {'samples': stats['samples'],
+                         'max_difference': stats['max_difference'],
+                         'speedup': speedup}
+
+    return summary
+
+def create_individual(label, design_data, boundaries, weights, 
+                      fixed_point=False, repair=False, backend='reference',
+                      evaluate=True):
     """
     Creates an individual by randomly allocating the spaces within the building 
     boundary. Every individual is labeled according to its generation number 
-    and number within the generation.
+    and number within the generation. If 'repair' is True, the spaces are 
+    repaired before the fitness value is computed. If 'evaluate' is False, the
+    fitness value is left to be computed by the caller.
     """
-    # Creates the spaces to be used by every individual
-    spaces = create_spaces(design_data, boundaries['building'][0])
+    # Creates the spaces to be used by every individual, each one within the
+    # building boundary it is assigned to
+    assignment = boundary_assignment(design_data, boundaries)
+    spaces = create_spaces(design_data,
+                           [boundaries['building'][b] for b in assignment],
+                           fixed_point)
+    if repair == True:
+        spaces = repair_spaces(spaces, boundaries, design_data)
 
     # Creates the individual based on the created spaces
     individual = Individual(label, spaces)
 
     # Computes the individual's initial fitness value
-    individual.compute_fitness_value(boundaries, design_data, weights)
+    if evaluate == True:
+        compute_fitness(individual, design_data, boundaries, weights, backend)
 
     return individual
 
+def create_population(size, elite_size, design_data, boundaries, weights,
+                      fixed_point=False, repair=False, executor=None,
+                      backend='reference', cancel=None):
+    """
+    Creates the initial population (generation zero) by randomly creating
+    individuals until the population size is reached. The individuals are 
+    evaluated together, in parallel if an executor created by 
+    'create_evaluation_executor' is given. The population is returned ranked 
+    by the individuals' fitness values, and isn't complete if the cancel 
+    event was set meanwhile.
+    """
+    # Creates the individuals of the first generation
+    individuals = []
+    for i in range(size):
+        label = "0.{:02d}".format(i + 1)
+        individuals.append(
+            create_individual(label, design_data, boundaries, weights,
+                              fixed_point, repair, backend, False)
+            )
+    compute_fitness_batch(individuals, design_data, boundaries, weights,
+                          executor, backend, cancel=cancel)
+
+    # Creates and ranks the population
+    population = Population(individuals, size, elite_size)
+    population.rank_individuals()
+
+    return population
+
+def mutate_individual(label, parent, design_data, rng, step=1.0):
+    """
+    Creates a new individual by copying the spaces of the parent and mutating
+    one of them. The mutation randomly translates, resizes or rotates the
+    space floor, or moves one of the space openings along its side. The new
+    individual's fitness value is not computed.
+    """
+    # Copies the list of spaces and picks the space to be mutated
+    spaces = list(parent.spaces)
+    i = int(rng.integers(len(spaces)))
+    space = spaces[i]
+
+    # Gets the current floor parameters and openings of the space, using the
+    # integer millimetres of the floor grid in fixed-point mode
+    fixed_point = space.grid is not None
+    if fixed_point == True:
+        x_coord, y_coord, width, height = [int(x) for x in space.grid]
+    else:
+        x_coord = space.position[0]
+        y_coord = space.position[1]
+        width = space.width
+        height = space.height
+    windows = list(space.windows)
+    doors = list(space.doors)
+
+    # Chooses and applies the mutation operator
+    operator = rng.choice(['translate', 'resize', 'rotate', 'opening'])
+
+    if operator == 'translate':
+        if fixed_point == True:
+            x_coord += int(round(rng.normal(scale=step * MM)))
+            y_coord += int(round(rng.normal(scale=step * MM)))
+        else:
+            x_coord = round(x_coord + rng.normal(scale=step), 3)
+            y_coord = round(y_coord + rng.normal(scale=step), 3)
+    elif operator == 'resize':
+        # Keeps the floor orientation by sampling the width from the same
+        # dimension range it currently belongs to
+        dimension_range = design_data.m_dim[i]
+        if dimension_range[0] <= space.width <= dimension_range[1]:
+            width = sample_value(rng, dimension_range[0], dimension_range[1],
+                                 fixed_point)
+            height = sample_value(rng, dimension_range[2], dimension_range[3],
+                                  fixed_point)
+        else:
+            width = sample_value(rng, dimension_range[2], dimension_range[3],
+                                 fixed_point)
+            height = sample_value(rng, dimension_range[0], dimension_range[1],
+                                  fixed_point)
+    elif operator == 'rotate':
+        width, height = height, width
+    else:
+        # Moves a random opening, if the space has any
+        openings = windows + doors
+        if len(openings) > 0:
+            j = int(rng.integers(len(openings)))
+            opening = openings[j]
+            moved = copy.copy(opening)
+            moved.position = round(rng.random(), 3)
+            if j < len(windows):
+                windows[j] = moved
+            else:
+                doors[j - len(windows)] = moved
+
+    # Creates the mutated space and the new individual
+    floor = create_floor((x_coord, y_coord), width, height, fixed_point)
+    spaces[i] = Space(space.label, floor, windows, doors, space.preferences)
+    individual = Individual(label, spaces)
+
+    return individual
+
+def evolve_population(population, generation, design_data, boundaries,
+                      weights, screening=False, repair=False, trajectory=None,
+                      executor=None, backend='reference', shadow=None,
+                      cancel=None):
+    """
+    Evolves the population by one generation. Every individual that is not
+    part of the elite group is replaced by a mutated copy of an elite member,
+    and the population is ranked and purged afterwards. If 'repair' is True,
+    the offspring are repaired right after the mutation. If a trajectory log
+    is given, the evaluated offspring are appended to it. The offspring are 
+    evaluated together, in parallel if an executor created by 
+    'create_evaluation_executor' is given.
+    If 'screening' is True, the fitness lower bound of every offspring is
+    computed first, and the offspring whose bound is already worse than the
+    worst elite individual are rejected without the exact evaluation.
+    In fixed-point mode, offspring that duplicate the genome of an individual
+    already in the population are rejected as well.
+    If a shadow report created by 'create_shadow_report' is given, a fraction
+    of the evaluated offspring is also evaluated with both backends to fill
+    the report.
+    If the cancel event is set, the evaluation stops as soon as possible and
+    only the elite group is kept.
+    Returns the number of offspring evaluated and rejected.
+    """
+    # Creates a NumPy random number generator to be used on random operations
+    rng = default_rng()
+
+    # Gets the elite group and the value an offspring must beat to join it
+    population.rank_individuals()
+    elite = population.individuals[:population.elite_size]
+    elite_worst = population.compute_elite_worst()
+
+    # Replaces the population by the elite group and its offspring
+    population.individuals = list(elite)
+    genomes = set([x.genome_key() for x in elite])
+    offspring_evaluated = []
+    rejected = 0
+
+    for i in range(population.size - len(elite)):
+        label = "{}.{:02d}".format(generation, i + 1)
+        parent = elite[i % len(elite)]
+        offspring = mutate_individual(label, parent, design_data, rng)
+        if repair == True:
+            offspring.spaces = repair_spaces(offspring.spaces, boundaries,
+                                             design_data)
+
+        # Rejects the offspring if its genome is already in the population
+        genome = offspring.genome_key()
+        if genome is not None:
+            if genome in genomes:
+                rejected += 1
+                continue
+            genomes.add(genome)
+
+        # Rejects the offspring if it can't reach the elite group
+        if screening == True:
+            bound = offspring.compute_fitness_bound(boundaries, design_data,
+                                                    weights)
+            if bound > elite_worst:
+                rejected += 1
+                continue
+
+        offspring_evaluated.append(offspring)
+
+    # Computes the exact fitness value of the offspring that were not 
+    # rejected
+    compute_fitness_batch(offspring_evaluated, design_data, boundaries,
+                          weights, executor, backend, cancel=cancel)
+    if cancel is not None and cancel.is_set():
+        return 0, rejected
+    for offspring in offspring_evaluated:
+        if shadow is not None and rng.random() < shadow['fraction']:
+            shadow_evaluate(offspring, design_data, boundaries, shadow)
+        population.add_individual(offspring)
+    evaluated = len(offspring_evaluated)
+
+    # Logs the evaluated offspring before they are purged
+    if trajectory is not None and evaluated > 0:
+        log_individuals(trajectory, generation, offspring_evaluated)
+
+    # Keeps the best individuals
+    population.purge()
+
+    return evaluated, rejected
+
+def move_space(space, coordinate, delta, dimension_range):
+    """
+    Creates a copy of a space with one floor coordinate (0 = x, 1 = y, 
+    2 = width, 3 = height) moved by delta. Returns None if the new floor 
+    dimensions are outside the dimension range of the space.
+    """
+    values = [space.position[0], space.position[1], space.width, space.height]
+    values[coordinate] = round(values[coordinate] + delta, 3)
+
+    # Checks that the dimensions still fit one of the floor orientations
+    width = values[2]
+    height = values[3]
+    landscape = dimension_range[0] <= width <= dimension_range[1] and \
+        dimension_range[2] <= height <= dimension_range[3]
+    portrait = dimension_range[2] <= width <= dimension_range[3] and \
+        dimension_range[0] <= height <= dimension_range[1]
+    if landscape == False and portrait == False:
+        return None
+
+    # Creates the moved floor, in millimetres if the fixed-point mode is used
+    if space.grid is not None:
+        values = [int(round(x * MM)) for x in values]
+    floor = create_floor((values[0], values[1]), values[2], values[3],
+                         space.grid is not None)
+
+    return Space(space.label, floor, space.windows, space.doors,
+                 space.preferences)
+
+def refine_individual(individual, design_data, boundaries, weights, sweeps=1,
+                      step=0.5, min_step=0.01, backend='reference'):
+    """
+    Refines an individual with a coordinate-wise local search. Every floor 
+    coordinate of every space is moved by +/- step and the move is kept only 
+    if the fitness value improves. The step is halved after a sweep without 
+    improvements. Moves are evaluated incrementally, recomputing only the 
+    terms of the moved space. The openings are not moved, given that they
+    don't change any of the implemented evaluators.
+    Returns the refined individual (or the original one if it couldn't be
+    improved) and the number of moves evaluated.
+    """
+    spaces = list(individual.spaces)
+    terms = ff.compute_space_terms(spaces, boundaries, design_data)
+    fitness = ff.terms_fitness(terms, boundaries, weights)
+    evaluations = 0
+    improved = False
+
+    for sweep in range(sweeps):
+        sweep_improved = False
+
+        for k in range(len(spaces)):
+            for coordinate in range(4):
+                for delta in [step, -step]:
+                    space = move_space(spaces[k], coordinate, delta,
+                                       design_data.m_dim[k])
+                    if space is None:
+                        continue
+
+                    # Evaluates the move by updating only the terms of the 
+                    # moved space
+                    previous = spaces[k]
+                    spaces[k] = space
+                    moved_terms = ff.copy_space_terms(terms)
+                    ff.update_space_terms(moved_terms, spaces, k, boundaries,
+                                          design_data)
+                    moved_fitness = ff.terms_fitness(moved_terms, boundaries,
+                                                     weights)
+                    evaluations += 1
+
+                    # Keeps the move only if it improves the fitness value
+                    if moved_fitness < fitness:
+                        terms = moved_terms
+                        fitness = moved_fitness
+                        sweep_improved = True
+                    else:
+                        spaces[k] = previous
+
+        # Halves the step if no move was kept during the sweep
+        if sweep_improved == True:
+            improved = True
+        else:
+            step = step / 2
+            if step < min_step:
+                break
+
+    if improved == False:
+        return individual, evaluations
+
+    # Computes the exact fitness value of the refined individual and keeps
+    # the original one if it is not better
+    refined = Individual(individual.label, spaces)
+    compute_fitness(refined, design_data, boundaries, weights, backend)
+    if refined.fitness_value >= individual.fitness_value:
+        return individual, evaluations
+
+    return refined, evaluations
+
+def refine_elite(population, design_data, boundaries, weights, sweeps=1,
+                 executor=None, backend='reference', trajectory=None,
+                 generation=0):
+    """
+    Refines every individual on the elite group with 'refine_individual'. If
+    an executor is given, the elite individuals are refined in parallel.
+    The population is ranked afterwards. If a trajectory log is given, the 
+    refined individuals that replaced elite individuals are appended to it
+    under the given generation. Returns the number of moves evaluated.
+    """
+    elite = population.individuals[:population.elite_size]
+
+    if executor is None:
+        results = [
+            refine_individual(x, design_data, boundaries, weights, sweeps,
+                              backend=backend)
+            for x in elite
+            ]
+    else:
+        design_data = design_data_namespace(design_data)
+        results = list(executor.map(refine_individual, elite,
+                                    repeat(design_data), repeat(boundaries),
+                                    repeat(weights), repeat(sweeps),
+                                    repeat(0.5), repeat(0.01),
+                                    repeat(backend)))
+
+    population.individuals[:len(elite)] = [x[0] for x in results]
+    population.rank_individuals()
+
+    # Logs the refined individuals, leaving out the ones kept unchanged
+    refined = [
+        x[0] for x, individual in zip(results, elite) if x[0] is not individual
+        ]
+    if trajectory is not None and len(refined) > 0:
+        log_individuals(trajectory, generation, refined)
+
+    return sum([x[1] for x in results])
+
+def genome_arrays(individual):
+    """
+    Converts the spaces of an individual into NumPy arrays. The floors array
+    has one row (x, y, width, height) per space and the openings array has one
+    row (space index, kind, side, position, size) per opening, where kind is 0
+    for windows and 1 for doors.
+    """
+    floors = []
+    openings = []
+
+    for i in range(len(individual.spaces)):
+        space = individual.spaces[i]
+        floors.append([space.position[0], space.position[1],
+                       space.width, space.height])
+
+        for window in space.windows:
+            openings.append([i, 0, window.side, window.position, window.size])
+        for door in space.doors:
+            openings.append([i, 1, door.side, door.position, door.size])
+
+    floors = np.array(floors, dtype=float).reshape(-1, 4)
+    openings = np.array(openings, dtype=float).reshape(-1, 5)
+
+    return floors, openings
+
+def log_individuals(trajectory, generation, individuals):
+    """
+    Appends the genomes, evaluator values and fitness values of evaluated
+    individuals to a trajectory log.
+    """
+    genomes = [genome_arrays(x) for x in individuals]
+
+    trajectory.append(generation,
+                      [x[0] for x in genomes],
+                      [x[1] for x in genomes],
+                      [x.evaluators for x in individuals],
+                      [x.fitness_value for x in individuals])
+
+    return
+
+def elite_diversity(population, boundary):
+    """
+    Computes the diversity of the elite group as the standard deviation of 
+    the floor positions among the elite individuals, averaged over all spaces 
+    and relative to the size of the boundary bounding rectangle.
+    """
+    elite = population.individuals[:population.elite_size]
+    floors = np.array([genome_arrays(x)[0] for x in elite])
+    spread = floors.std(axis=0)
+
+    diversity = 0.5 * (spread[:, 0].mean() / boundary.width + 
+                       spread[:, 1].mean() / boundary.height)
+
+    return diversity
+
+def control_run(population, generation, history, boundary, adaptive=False,
+                target_fitness=None, patience=None, tolerance=1e-3,
+                min_size=None, max_size=None, diversity_threshold=0.05,
+                grow_threshold=1e-3, shrink_threshold=0.05):
+    """
+    Decides if the run must stop and, if 'adaptive' is True, resizes the 
+    population. The history is the list of elite average fitness values of 
+    all generations so far. The run stops when the best fitness value reaches 
+    the target fitness, or when the elite average has improved by less than 
+    the relative tolerance over the last 'patience' generations.
+    The population grows when the last relative improvement of the elite is 
+    below 'grow_threshold' and its diversity is below 'diversity_threshold',
+    and shrinks while the improvement is above 'shrink_threshold'. Every
+    decision, including keeping the size, is logged.
+    Returns the reason for stopping, or None if the run must go on.
+    """
+    best_fitness = population.individuals[0].fitness_value
+
+    # Stops the run if the target fitness was reached
+    if target_fitness is not None and best_fitness <= target_fitness:
+        logger.info("Generation %d: best fitness %.4f reached the target "
+                    "%.4f, stopping.", generation, best_fitness, 
+                    target_fitness)
+        return 'target'
+
+    # Stops the run if the elite average stagnated
+    if patience is not None and len(history) > patience:
+        previous = history[-patience - 1]
+        improvement = (previous - history[-1]) / max([abs(previous), 1e-12])
+        if improvement < tolerance:
+            logger.info("Generation %d: elite average improved %.2e in %d "
+                        "generations, stopping.", generation, improvement,
+                        patience)
+            return 'stagnation'
+
+    if adaptive == False or len(history) < 2:
+        return None
+
+    # Computes the last improvement rate and the elite diversity
+    rate = (history[-2] - history[-1]) / max([abs(history[-2]), 1e-12])
+    diversity = elite_diversity(population, boundary)
+
+    # Grows the population to explore more if the elite is stuck, or shrinks
+    # it to save evaluations while the elite improves quickly
+    size = population.size
+    if rate < grow_threshold and diversity < diversity_threshold:
+        size = int(size * 1.5)
+    elif rate > shrink_threshold:
+        size = int(size * 0.75)
+
+    if min_size is not None:
+        size = max([size, min_size])
+    if max_size is not None:
+        size = min([size, max_size])
+
+    if size != population.size:
+        logger.info("Generation %d: improvement rate %.2e and elite "
+                    "diversity %.3f, resizing the population from %d to %d.",
+                    generation, rate, diversity, population.size, size)
+        population.size = size
+    else:
+        logger.info("Generation %d: improvement rate %.2e and elite "
+                    "diversity %.3f, keeping the population size %d.",
+                    generation, rate, diversity, size)
+
+    return None
+
+def create_snapshot(generation, population, evaluated, rejected,
+                    generation_time, elapsed_time, refined=0, stop=None,
+                    shadow=None):
+    """
+    Creates the snapshot of a generation, holding the progress values of the
+    run and the genome of the best individual as arrays. A snapshot doesn't
+    keep references to the population, so it can be stored or sent elsewhere
+    without holding the individuals in memory.
+    """
+    best = population.individuals[0]
+    floors, openings = genome_arrays(best)
+
+    snapshot = {
+        'generation': generation,
+        'best_label': best.label,
+        'best_fitness': best.fitness_value,
+        'elite_favg': population.compute_elite_favg(),
+        'evaluated': evaluated,
+        'rejected': rejected,
+        'refined': refined,
+        'population_size': population.size,
+        'stop': stop,
+        'generation_time': generation_time,
+        'elapsed_time': elapsed_time,
+        'shadow': shadow,
+        'floors': floors,
+        'openings': openings
+        }
+
+    return snapshot
+
+def run(design_data, boundaries, weights, k=10, elite_size=15,
+        generations=None, screening=False, fixed_point=False, repair=False,
+        local_search=0, workers=None, adaptive=False, target_fitness=None,
+        patience=None, tolerance=1e-3, trajectory_path=None,
+        evaluation_workers=None, backend='reference', shadow_fraction=0.0,
+        cancel=None, grow_threshold=1e-3, shrink_threshold=0.05):
+    """
+    Runs the evolutionary program and yields a snapshot after every
+    generation, starting with the initial population (generation zero).
+    The run stops after the given number of generations, or never if
+    'generations' is None, so the caller can stop it at any time by
+    breaking out of the loop. If 'fixed_point' is True, the genomes are 
+    stored as integer millimetres. If 'repair' is True, every new individual
+    is repaired before its evaluation. If 'local_search' is larger than zero,
+    the elite group is refined every generation with that number of local 
+    search sweeps, in parallel over 'workers' processes if given.
+    The run also stops early when the target fitness is reached or when the 
+    elite average stagnates for 'patience' generations, and the population 
+    is resized every generation if 'adaptive' is True, growing and shrinking
+    according to 'grow_threshold' and 'shrink_threshold' (see 
+    'control_run').
+    If 'trajectory_path' is given, every evaluated individual is written to
+    a trajectory log in that directory. The individuals of every generation 
+    are evaluated in parallel over 'evaluation_workers' processes if given.
+    If the design data assigns the spaces to several building boundaries 
+    ('m_bnd'), the boundaries are evaluated as sub-problems. The screening 
+    and the local search only support a single building boundary and are 
+    disabled in that case.
+    The evaluators are computed with the given backend. If 'shadow_fraction'
+    is larger than zero, that fraction of the offspring is also evaluated
+    with both backends, and the snapshots report the maximum difference and
+    the speedup of every evaluator (see 'create_shadow_report').
+    If a cancel event (e.g. threading.Event) is given, the run stops as soon
+    as it is set, even in the middle of a generation, without yielding the 
+    incomplete generation.
+    """
+    start_time = time.perf_counter()
+    executor = None
+    evaluation_executor = None
+    trajectory = None
+    shadow = None
+
+    try:
+        # Sets up the sub-problems of every building boundary
+        if has_subproblems(design_data, boundaries):
+            if screening == True or local_search > 0:
+                logger.warning("Screening and local search only support a "
+                               "single building boundary, disabling them.")
+                screening = False
+                local_search = 0
+
+        # Creates the worker processes used by the evaluation and the local 
+        # search, and the log of the evaluated individuals
+        if evaluation_workers is not None and evaluation_workers > 1:
+            evaluation_executor = create_evaluation_executor(
+                design_data, boundaries, evaluation_workers)
+        if local_search > 0 and workers is not None and workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        if trajectory_path is not None:
+            trajectory = TrajectoryLog(trajectory_path)
+        if shadow_fraction > 0:
+            shadow = create_shadow_report(shadow_fraction)
+
+        # Creates the initial population
+        size = compute_population_size(k, elite_size, design_data)
+        population = create_population(size, elite_size, design_data,
+                                       boundaries, weights, fixed_point,
+                                       repair, evaluation_executor, backend,
+                                       cancel)
+        if cancel is not None and cancel.is_set():
+            return
+        if trajectory is not None:
+            log_individuals(trajectory, 0, population.individuals)
+        elapsed_time = time.perf_counter() - start_time
+
+        # Keeps the elite average of every generation to control the run
+        history = [population.compute_elite_favg()]
+        stop = control_run(population, 0, history, boundaries['building'][0],
+                           target_fitness=target_fitness)
+
+        yield create_snapshot(0, population, size, 0, elapsed_time,
+                              elapsed_time, stop=stop)
+
+        # Evolves the population until the number of generations is reached
+        generation = 1
+        while stop is None and (generations is None or 
+                                generation <= generations):
+            generation_start = time.perf_counter()
+            evaluated, rejected = evolve_population(population, generation,
+                                                    design_data, boundaries,
+                                                    weights, screening, repair,
+                                                    trajectory,
+                                                    evaluation_executor,
+                                                    backend, shadow, cancel)
+            if cancel is not None and cancel.is_set():
+                return
+
+            # Refines the elite group with the local search
+            refined = 0
+            if local_search > 0:
+                refined = refine_elite(population, design_data, boundaries,
+                                       weights, local_search, executor,
+                                       backend, trajectory, generation)
+            generation_end = time.perf_counter()
+
+            # Checks the stopping criteria and adapts the population size
+            history.append(population.compute_elite_favg())
+            stop = control_run(population, generation, history,
+                               boundaries['building'][0], adaptive,
+                               target_fitness, patience, tolerance,
+                               2 * elite_size, 4 * size,
+                               grow_threshold=grow_threshold,
+                               shrink_threshold=shrink_threshold)
+
+            if shadow is not None:
+                summary = summarize_shadow_report(shadow)
+            else:
+                summary = None
+
+            yield create_snapshot(generation, population, evaluated, rejected,
+                                  generation_end - generation_start,
+                                  generation_end - start_time, refined, stop,
+                                  summary)
+
+            generation += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if evaluation_executor is not None:
+            evaluation_executor.shutdown(cancel_futures=True)
+        if trajectory is not None:
+            trajectory.close()
+
+    return
+
 def main():
 
     # Imports boundaries from a DXF file
@@ -9,9 +9,24 @@
 # Release Date: WIP - 03/13/2022
 
 import sys
+import numpy as np
 
-from shapely.geometry import Polygon as ShpPolygon
-from compas.geometry import offset_polygon
+from math import sqrt
+from shapely.geometry import Polygon as ShpPolygon, box
+
+# Number of grid units (millimetres) per meter used by the fixed-point mode
+MM = 1000
+
+def round_area(area):
+    """
+    Rounds an area to three decimals in the fast evaluators. The area is 
+    snapped to six decimals first, the precision of the product of 
+    coordinates with three decimals, so the floating point noise left by 
+    NumPy never changes the rounded value. The reference evaluators keep 
+    rounding the noisy Shapely areas, so the two may differ by 0.001 on an 
+    area that falls halfway between two rounded values.
+    """
+    return round(round(area, 6), 3)
 
 def connectivity_and_adjacency(spaces, design_data):
     """
@@ -114,27 +129,33 @@ def spaces_overlap(spaces, boundaries):
     """
     # Declares the spaces overlap values list to store values for all spaces
     ov_values = []
-    
-    # Starts the computation by iterating through the spaces j in every i
-    for i in range(len(spaces)):
-        # Declares the j index and the list to store connectivity values
-        i_ov = []
 
-        # Iterates through the spaces list to get its overlap values
-        for j in range(len(spaces)):
-            # Checks if the spaces i and j being evaluated area not the same
-            if j == i:
-                continue
+    # Computes the overlap among floors with exact integer arithmetic if the
+    # spaces were created in fixed-point mode
+    if spaces[0].grid is not None:
+        ov_values.append(int(overlap_grid(spaces).sum()) / MM**2)
+    else:
+        # Starts the computation by iterating through the spaces j in every i
+        for i in range(len(spaces)):
+            # Declares the j index and the list to store connectivity values
+            i_ov = []
 
-            # Transforms the spaces in Shapely Polygons to compute the boolean
-            # intersection of the spaces
-            shp_r1 = ShpPolygon(spaces[i].geometry.points)
-            shp_r2 = ShpPolygon(spaces[j].geometry.points)
+            # Iterates through the spaces list to get its overlap values
+            for j in range(len(spaces)):
+                # Checks if the spaces i and j being evaluated area not the 
+                # same
+                if j == i:
+                    continue
 
-            # Computes the area of the intersection and adds to the list
-            intersection = shp_r1.intersection(shp_r2)
-            if intersection.area > 0:
-                ov_values.append(round(intersection.area, 3))
+                # Transforms the spaces in Shapely Polygons to compute the 
+                # boolean intersection of the spaces
+                shp_r1 = ShpPolygon(spaces[i].geometry.points)
+                shp_r2 = ShpPolygon(spaces[j].geometry.points)
+
+                # Computes the area of the intersection and adds to the list
+                intersection = shp_r1.intersection(shp_r2)
+                if intersection.area > 0:
+                    ov_values.append(round(intersection.area, 3))
         
     # Computes the overlap between spaces and the adjacent buildings
     for adjacent in boundaries['adjacent']:
@@ -176,7 +197,11 @@ def floor_dimensions(spaces, design_data):
     for i in range(len(spaces)):
         if design_data.m_far[i] is not None:
             # Gets the area of the space in the current individual
-            space_area = spaces[i].geometry.area
+            if spaces[i].grid is not None:
+                space_area = int(spaces[i].grid[2]) * int(spaces[i].grid[3]) \
+                    / MM**2
+            else:
+                space_area = spaces[i].geometry.area
 
             # If the area of the space is below the minimum required, add it
             # to the missing areas list
@@ -219,14 +244,23 @@ def compactness(spaces, boundaries):
             ov_building.append(round(intersection.area, 3))
     
     # Computes the overlap between every space to decrease it from the 
-    # compactness value
+    # compactness value. In fixed-point mode the overlap areas are integer 
+    # square millimetres and every pair of spaces is counted once
     ov_spaces = []
+    areas = None
+    if spaces[0].grid is not None:
+        areas = overlap_grid(spaces)
 
     for i in range(len(spaces)):
         for j in range(len(spaces)):
             # Checks if the spaces i and j being evaluated area not the same
             if j == i:
                 continue
+
+            # Skips the repeated pairs and the spaces that don't overlap in 
+            # fixed-point mode
+            if areas is not None and (j < i or areas[i, j] == 0):
+                continue
             
             # Converts the space floor to a Shapely Polygon
             ri = ShpPolygon(spaces[i].geometry.points)
@@ -238,16 +272,21 @@ def compactness(spaces, boundaries):
             building_overlap = building.intersection(intersection)
 
             # Adds the value to the list if it is greater than zero
-            if building_overlap.area > 0:
+            if building_overlap.area > 0 and areas is not None:
+                ov_spaces.append(int(areas[i, j]))
+            elif building_overlap.area > 0:
                 ov_spaces.append(round(intersection.area, 3))
     
     # Prunes the duplicate values in the spaces list (that is due to the nature
-    # of the iteration among floors)
-    ov_spaces = list(set(ov_spaces))
+    # of the iteration among floors), given that in fixed-point mode every 
+    # pair was visited only once
+    if areas is not None:
+        ov_spaces = [sum(ov_spaces) / MM**2]
+    else:
+        ov_spaces = list(set(ov_spaces))
 
     # Computes the compactness evaluator value based on the obtained parameters
     evaluator = boundary_area - sum(ov_building) - sum(ov_spaces)
-    print(evaluator)
 
     return evaluator
 
@@ -259,18 +298,20 @@ def overflow(spaces, boundaries, design_data):
     deflated according to the exterior and interior wall thickness (creating a
     boundary based on the core line of the walls).
     """
-    # Creates the deflated building boundary by offseting it according to the
-    # exterior and interior wall thickness
+    # Gets the deflated building boundary, offset according to the exterior 
+    # and interior wall thickness
     offset_distance = design_data.t_ew - (0.5 * design_data.t_iw)
-    building = offset_polygon(
-        boundaries['building'][0].geometry.points, offset_distance
-        )
-    deflated_boundary = ShpPolygon(building)
+    deflated_boundary = boundaries['building'][0].deflate(offset_distance)[0]
 
     # Computes the sum of all space areas for evaluation
-    space_area = sum([
-        round(spaces[i].geometry.area, 3) for i in range(len(spaces))
-        ])
+    if spaces[0].grid is not None:
+        space_area = sum([
+            int(space.grid[2]) * int(space.grid[3]) for space in spaces
+            ]) / MM**2
+    else:
+        space_area = sum([
+            round(spaces[i].geometry.area, 3) for i in range(len(spaces))
+            ])
 
     # Computes the overlaps between the spaces and the building boundary
     ov_building = []
@@ -287,4 +328,704 @@ def overflow(spaces, boundaries, design_data):
     # Computes the overflow evaluator value based on the obtained parameters
     evaluator = space_area - sum(ov_building)
 
-    return evaluator
\ No newline at end of file
+    return evaluator
+
+def rectilinear_decomposition(points):
+    """
+    Decomposes a rectilinear polygon into disjoint axis-aligned rectangles, 
+    given as an array with the rows (x_0, y_0, x_1, y_1). The polygon is split 
+    in vertical slabs at every vertex X coordinate, and consecutive slabs with 
+    the same Y intervals are merged. Returns None if the polygon has any edge 
+    that is neither horizontal nor vertical.
+    """
+    # Snaps the coordinates to remove the noise left by the offset and drops
+    # the closing point, if any
+    coordinates = [(round(p[0], 9), round(p[1], 9)) for p in points]
+    if coordinates[0] == coordinates[-1]:
+        coordinates = coordinates[:-1]
+
+    # Gets the horizontal edges and checks that the polygon is rectilinear
+    horizontal = []
+    for k in range(len(coordinates)):
+        x_0, y_0 = coordinates[k]
+        x_1, y_1 = coordinates[(k + 1) % len(coordinates)]
+        if y_0 == y_1:
+            horizontal.append((min([x_0, x_1]), max([x_0, x_1]), y_0))
+        elif x_0 != x_1:
+            return None
+
+    # Computes the Y intervals inside the polygon for every slab
+    xs = sorted(set([x for x, y in coordinates]))
+    rectangles = []
+    current = {}
+
+    for k in range(len(xs) - 1):
+        x_mid = 0.5 * (xs[k] + xs[k + 1])
+        ys = sorted([y for x_0, x_1, y in horizontal if x_0 < x_mid < x_1])
+
+        # Extends the rectangles of the previous slab with the same interval
+        # and closes the others
+        following = {}
+        for m in range(0, len(ys) - 1, 2):
+            interval = (ys[m], ys[m + 1])
+            if interval in current:
+                rectangle = current.pop(interval)
+                rectangle[2] = xs[k + 1]
+            else:
+                rectangle = [xs[k], ys[m], xs[k + 1], ys[m + 1]]
+            following[interval] = rectangle
+
+        rectangles.extend(current.values())
+        current = following
+
+    rectangles.extend(current.values())
+
+    return np.array(rectangles, dtype=float).reshape(-1, 4)
+
+def rectilinear_overlap(floors, rectangles):
+    """
+    Computes the overlapping area between every floor and a set of disjoint
+    rectangles. The floors are given as an array of shape (..., 4) with the 
+    rows (x, y, width, height) and the rectangles as an array of shape (m, 4) 
+    with the rows (x_0, y_0, x_1, y_1). Returns an array of shape (...).
+    """
+    # Adds an axis to the floor extents to clip them against all rectangles
+    x_0 = floors[..., 0, None]
+    y_0 = floors[..., 1, None]
+    x_1 = x_0 + floors[..., 2, None]
+    y_1 = y_0 + floors[..., 3, None]
+
+    dx = np.minimum(x_1, rectangles[:, 2]) - np.maximum(x_0, rectangles[:, 0])
+    dy = np.minimum(y_1, rectangles[:, 3]) - np.maximum(y_0, rectangles[:, 1])
+
+    areas = (np.clip(dx, 0, None) * np.clip(dy, 0, None)).sum(axis=-1)
+
+    return areas
+
+def overlap_grid(spaces):
+    """
+    Computes the matrix of overlapping areas among all floors, in square 
+    millimetres, using the integer floor grids of the fixed-point mode. The 
+    diagonal of the matrix is zero.
+    """
+    # Gets the floor extents as 64-bit integers to avoid overflows
+    grid = np.array([space.grid for space in spaces], dtype=np.int64)
+
+    return pairwise_overlap(grid)
+
+def floor_array(spaces):
+    """
+    Gets the floors of the spaces as an array with the rows 
+    (x, y, width, height).
+    """
+    floors = np.array([
+        [x.position[0], x.position[1], x.width, x.height] for x in spaces
+        ], dtype=float)
+
+    return floors
+
+def pairwise_overlap(floors):
+    """
+    Computes the matrix of overlapping areas among all floors, given as an 
+    array with the rows (x, y, width, height). The diagonal of the matrix is 
+    zero.
+    """
+    x_0 = floors[:, 0]
+    y_0 = floors[:, 1]
+    x_1 = x_0 + floors[:, 2]
+    y_1 = y_0 + floors[:, 3]
+
+    # Computes the overlapping extents for every pair of floors
+    dx = np.minimum(x_1[:, None], x_1[None, :]) - \
+        np.maximum(x_0[:, None], x_0[None, :])
+    dy = np.minimum(y_1[:, None], y_1[None, :]) - \
+        np.maximum(y_0[:, None], y_0[None, :])
+
+    areas = np.clip(dx, 0, None) * np.clip(dy, 0, None)
+    np.fill_diagonal(areas, 0)
+
+    return areas
+
+def rectangle_overlap(r1, r2):
+    """
+    Computes the overlapping area between two axis-aligned rectangles, each 
+    given by its bottom-left position, width and height. This is used by the 
+    bounding rectangle approximations of the evaluators.
+    """
+    # Computes the overlapping extents along the X and Y axes
+    dx = min([r1.position[0] + r1.width, r2.position[0] + r2.width]) - \
+        max([r1.position[0], r2.position[0]])
+    dy = min([r1.position[1] + r1.height, r2.position[1] + r2.height]) - \
+        max([r1.position[1], r2.position[1]])
+
+    # Returns zero if the rectangles don't overlap
+    if dx <= 0 or dy <= 0:
+        return 0.0
+
+    return dx * dy
+
+def spaces_overlap_bound(spaces, boundaries):
+    """
+    Computes a lower bound of the Spaces Overlap Evaluator.
+    The overlap among floors is exact, given that floors are rectangles, while
+    the overlap with the adjacent buildings is bounded by zero.
+    """
+    # Computes the overlap among floors with the same integer arithmetic as
+    # the exact evaluator in fixed-point mode
+    if spaces[0].grid is not None:
+        return int(overlap_grid(spaces).sum()) / MM**2
+
+    # Declares the spaces overlap values list to store values for all spaces
+    ov_values = []
+
+    # Computes the overlap between every pair of spaces i and j
+    for i in range(len(spaces)):
+        for j in range(len(spaces)):
+            # Checks if the spaces i and j being evaluated area not the same
+            if j == i:
+                continue
+
+            # Computes the area of the intersection and adds to the list
+            intersection = rectangle_overlap(spaces[i], spaces[j])
+            if intersection > 0:
+                ov_values.append(round(intersection, 3))
+
+    # Sums all the overlap values for the individual
+    evaluator = sum(ov_values)
+
+    return evaluator
+
+def floor_dimensions_bound(spaces, design_data):
+    """
+    Computes the Floor Dimensions Evaluator using the floor width and height
+    instead of the polygon area.
+    """
+    # Declares the list to store the amount of spaces that are underdimensioned
+    missing_areas = []
+
+    for i in range(len(spaces)):
+        if design_data.m_far[i] is not None:
+            # Gets the area of the space from its rectangle dimensions
+            space_area = spaces[i].width * spaces[i].height
+
+            # If the area of the space is below the minimum required, add it
+            # to the missing areas list
+            if design_data.m_far[i] > space_area:
+                missing_areas.append(design_data.m_far[i] - space_area)
+
+    # Computes the floor dimensions evaluator value
+    evaluator = sum(missing_areas)
+
+    return evaluator
+
+def compactness_bound(spaces, boundaries):
+    """
+    Computes a lower bound of the Compactness Evaluator.
+    The building boundary is replaced by its bounding rectangle, which 
+    contains it, so the covered areas can only be overestimated.
+    """
+    # Declares the area of the building boundary
+    building = boundaries['building'][0]
+    boundary_area = round(building.geometry.area, 3)
+
+    # Computes the overlap between every space and the bounding rectangle
+    ov_building = []
+
+    for i in range(len(spaces)):
+        intersection = rectangle_overlap(spaces[i], building)
+        if intersection > 0:
+            ov_building.append(round(intersection, 3))
+
+    # Computes the overlap between every space that lies within the bounding
+    # rectangle, the same way the exact evaluator does
+    fixed_point = spaces[0].grid is not None
+    ov_spaces = []
+
+    for i in range(len(spaces)):
+        for j in range(len(spaces)):
+            # Checks if the spaces i and j being evaluated area not the same,
+            # and visits every pair only once in fixed-point mode
+            if j == i or (fixed_point == True and j < i):
+                continue
+
+            # Computes the intersection rectangle between the spaces i and j
+            x_0 = max([spaces[i].position[0], spaces[j].position[0]])
+            y_0 = max([spaces[i].position[1], spaces[j].position[1]])
+            x_1 = min([spaces[i].position[0] + spaces[i].width,
+                       spaces[j].position[0] + spaces[j].width])
+            y_1 = min([spaces[i].position[1] + spaces[i].height,
+                       spaces[j].position[1] + spaces[j].height])
+
+            # Checks if the intersection overlaps the bounding rectangle
+            inside_x = min([x_1, building.position[0] + building.width]) > \
+                max([x_0, building.position[0]])
+            inside_y = min([y_1, building.position[1] + building.height]) > \
+                max([y_0, building.position[1]])
+
+            # Adds the value to the list if it overlaps the bounding rectangle,
+            # without rounding in fixed-point mode as the exact evaluator 
+            # sums the integer areas
+            if x_1 > x_0 and y_1 > y_0 and inside_x and inside_y:
+                area = (x_1 - x_0) * (y_1 - y_0)
+                if fixed_point == False:
+                    area = round(area, 3)
+                ov_spaces.append(area)
+
+    # Prunes the duplicate values in the spaces list
+    if fixed_point == False:
+        ov_spaces = list(set(ov_spaces))
+
+    # Computes the compactness bound, which can't be lower than zero
+    evaluator = max([0.0, boundary_area - sum(ov_building) - sum(ov_spaces)])
+
+    return evaluator
+
+def overflow_bound(spaces, boundaries, design_data):
+    """
+    Computes a lower bound of the Overflow Evaluator.
+    The deflated building boundary is replaced by the bounding rectangle of 
+    the building boundary, which contains it, so the overflow can only be 
+    underestimated. The exact evaluator rounds every intersection area, so
+    each overlap is raised by half of the rounding step instead.
+    """
+    building = boundaries['building'][0]
+
+    # Computes the sum of all space areas the same way the exact evaluator 
+    # does
+    if spaces[0].grid is not None:
+        space_area = sum([
+            int(space.grid[2]) * int(space.grid[3]) for space in spaces
+            ]) / MM**2
+    else:
+        space_area = sum([
+            round(spaces[i].geometry.area, 3) for i in range(len(spaces))
+            ])
+
+    # Computes the overlaps between the spaces and the bounding rectangle
+    ov_building = []
+
+    for i in range(len(spaces)):
+        intersection = rectangle_overlap(spaces[i], building)
+        if intersection > 0:
+            ov_building.append(intersection + 0.0005)
+
+    # Computes the overflow bound, which can't be lower than zero
+    evaluator = max([0.0, space_area - sum(ov_building)])
+
+    return evaluator
+
+def connectivity_term(spaces, i, j, design_data):
+    """
+    Computes the term of the Connectivity/Adjacency Evaluator for the spaces
+    i and j, the same way 'connectivity_and_adjacency' does.
+    """
+    # Computes the c-value the same way the full evaluator does
+    c = design_data.t_iw + \
+        max([sum(design_data.m_ids[i]), sum(design_data.m_ids[0])])
+
+    value = design_data.m_con[i][j]
+    if value == 0:
+        return 0.0
+    elif value == 1:
+        return fcdis(spaces[i], spaces[j], c)
+    elif value == 2:
+        return 0.1 * fcdis(spaces[i], spaces[j], 0)
+    else:
+        sys.exit("Value out of range, review the connectivity matrix \
+            and ensure that the values are integers between 0 and 2.")
+
+def compute_space_terms(spaces, boundaries, design_data):
+    """
+    Computes the per-space and per-pair terms of the evaluators, so that the
+    fitness value can be updated when a single space changes without 
+    recomputing the whole individual. The terms are returned as a dictionary
+    of NumPy arrays, along with the Shapely polygons of the site.
+    """
+    n = len(spaces)
+    terms = {
+        'connectivity': np.zeros((n, n)),
+        'overlap': np.zeros((n, n)),
+        'overlap_in_building': np.zeros((n, n), dtype=bool),
+        'adjacent': np.zeros(n),
+        'missing': np.zeros(n),
+        'building': np.zeros(n),
+        'area': np.zeros(n),
+        'deflated': np.zeros(n),
+        'fixed_point': spaces[0].grid is not None,
+        'site': (
+            ShpPolygon(boundaries['building'][0].geometry.points),
+            [ShpPolygon(x.geometry.points) for x in boundaries['adjacent']]
+            )
+        }
+
+    for k in range(n):
+        update_space_terms(terms, spaces, k, boundaries, design_data)
+
+    return terms
+
+def copy_space_terms(terms):
+    """
+    Copies the terms of an individual, sharing the Shapely polygons of the
+    site.
+    """
+    copied = {}
+    for key, value in terms.items():
+        if isinstance(value, np.ndarray):
+            copied[key] = value.copy()
+        else:
+            copied[key] = value
+
+    return copied
+
+def update_space_terms(terms, spaces, k, boundaries, design_data):
+    """
+    Updates the terms that depend on the space k, after it has changed. Only
+    the pairs involving the space k are recomputed.
+    """
+    building, adjacents = terms['site']
+    rk = ShpPolygon(spaces[k].geometry.points)
+
+    # Gets the overlaps of the space k in integer square millimetres in 
+    # fixed-point mode, as the full evaluators do
+    if terms['fixed_point'] == True:
+        grid_overlap = overlap_grid(spaces)[k]
+
+    # Updates the pairwise terms between the space k and every other space
+    for j in range(len(spaces)):
+        terms['connectivity'][k, j] = \
+            connectivity_term(spaces, k, j, design_data)
+        terms['connectivity'][j, k] = \
+            connectivity_term(spaces, j, k, design_data)
+        if j == k:
+            continue
+
+        if terms['fixed_point'] == True:
+            area = int(grid_overlap[j])
+        else:
+            area = round(rectangle_overlap(spaces[k], spaces[j]), 3)
+        in_building = False
+        if area > 0:
+            # Checks if the intersection of the floors overlaps the building
+            x_0 = max([spaces[k].position[0], spaces[j].position[0]])
+            y_0 = max([spaces[k].position[1], spaces[j].position[1]])
+            x_1 = min([spaces[k].position[0] + spaces[k].width,
+                       spaces[j].position[0] + spaces[j].width])
+            y_1 = min([spaces[k].position[1] + spaces[k].height,
+                       spaces[j].position[1] + spaces[j].height])
+            intersection = box(x_0, y_0, x_1, y_1)
+            in_building = building.intersection(intersection).area > 0
+
+        terms['overlap'][k, j] = terms['overlap'][j, k] = area
+        terms['overlap_in_building'][k, j] = in_building
+        terms['overlap_in_building'][j, k] = in_building
+
+    # Updates the overlap between the space k and the adjacent buildings
+    ov_adjacent = []
+    for adjacent in adjacents:
+        intersection = adjacent.intersection(rk)
+        if intersection.area > 0:
+            ov_adjacent.append(round(intersection.area, 3))
+    terms['adjacent'][k] = sum(ov_adjacent)
+
+    # Updates the missing floor area of the space k
+    if terms['fixed_point'] == True:
+        space_area = int(spaces[k].grid[2]) * int(spaces[k].grid[3]) / MM**2
+    else:
+        space_area = spaces[k].geometry.area
+    missing = 0.0
+    if design_data.m_far[k] is not None and design_data.m_far[k] > space_area:
+        missing = design_data.m_far[k] - space_area
+    terms['missing'][k] = missing
+
+    # Updates the area of the space k and its overlaps with the building 
+    # boundary and the deflated building boundary, the area being kept 
+    # unrounded in fixed-point mode
+    if terms['fixed_point'] == True:
+        terms['area'][k] = space_area
+    else:
+        terms['area'][k] = round(space_area, 3)
+    terms['building'][k] = round(building.intersection(rk).area, 3)
+
+    offset_distance = design_data.t_ew - (0.5 * design_data.t_iw)
+    deflated_boundary = boundaries['building'][0].deflate(offset_distance)[0]
+    terms['deflated'][k] = round(deflated_boundary.intersection(rk).area, 3)
+
+    return
+
+def terms_fitness(terms, boundaries, weights):
+    """
+    Computes the fitness value of an individual from its terms. The value
+    matches the one computed by the full evaluators, including the clipping
+    of negative evaluators to zero.
+    """
+    boundary_area = round(boundaries['building'][0].geometry.area, 3)
+    overlap = terms['overlap']
+
+    # Counts every pair of spaces once in fixed-point mode, where the 
+    # overlaps are integer square millimetres, otherwise prunes the duplicate
+    # values as the full evaluator does
+    if terms['fixed_point'] == True:
+        in_building = np.triu(terms['overlap_in_building'])
+        ov_spaces = [overlap[in_building].sum() / MM**2]
+        overlap = overlap / MM**2
+    else:
+        ov_spaces = set(overlap[terms['overlap_in_building']].tolist())
+
+    # Computes the evaluators, given that the Openings Overlap Evaluator is 
+    # always zero
+    f1 = terms['connectivity'].sum()
+    f2 = sqrt(max([0.0, overlap.sum() + terms['adjacent'].sum()]))
+    f3 = 0.0
+    f5 = sqrt(terms['missing'].sum())
+    f6 = sqrt(max([0.0, boundary_area - terms['building'].sum() - 
+                   sum(ov_spaces)]))
+    f7 = sqrt(max([0.0, terms['area'].sum() - terms['deflated'].sum()]))
+
+    # Computes the weighted values of the evaluators
+    weighted_values = [
+        weights[0] * f1,
+        weights[1] * f2,
+        weights[2] * f3,
+        weights[3] * f5,
+        weights[4] * f6,
+        weights[5] * f7
+        ]
+
+    return sum(weighted_values)
+
+def fcdis_array(dx, dy, c):
+    """
+    Computes the connectivity distance for arrays of x-coordinate and 
+    y-coordinate distances, following the same cases as 'fcdis'.
+    """
+    conditions = [
+        (dx >= 0) & (dy >= 0),
+        (dx >= 0) & (dy + c >= 0),
+        (dx + c >= 0) & (dy >= 0),
+        (dx >= 0) & (dy + c < 0),
+        (dx + c < 0) & (dy >= 0),
+        (dx + c >= 0) & (dy + c >= 0),
+        (dx + c >= 0) & (dy + c < 0),
+        (dx + c < 0) & (dy + c >= 0),
+        (dx + c < 0) & (dy + c < 0)
+        ]
+    choices = [
+        dx + dy + c,
+        dx + dy + c,
+        dx + dy + c,
+        dx,
+        dy,
+        np.minimum(dx + c, dy + c) - np.maximum(dx, dy),
+        np.abs(dx),
+        np.abs(dy),
+        np.minimum(np.abs(dx), np.abs(dy))
+        ]
+
+    return np.select(conditions, choices, default=0.0)
+
+def connectivity_and_adjacency_fast(spaces, design_data):
+    """
+    Computes the Connectivity/Adjacency Evaluator with NumPy, evaluating the
+    connectivity distance of all pairs of spaces at once.
+    """
+    m_con = np.array(design_data.m_con)
+    if np.isin(m_con, [0, 1, 2]).all() == False:
+        sys.exit("Value out of range, review the connectivity matrix \
+            and ensure that the values are integers between 0 and 2.")
+
+    # Computes the x-coordinate and y-coordinate distances of all pairs
+    floors = floor_array(spaces)
+    dx = np.abs(floors[:, None, 0] - floors[None, :, 0]) - \
+        floors[:, None, 2] - floors[None, :, 2]
+    dy = np.abs(floors[:, None, 1] - floors[None, :, 1]) - \
+        floors[:, None, 3] - floors[None, :, 3]
+
+    # Computes the c-value of every space i the same way the reference 
+    # evaluator does
+    c = np.array([
+        design_data.t_iw + 
+        max([sum(design_data.m_ids[i]), sum(design_data.m_ids[0])])
+        for i in range(len(spaces))
+        ])[:, None]
+
+    values = np.where(m_con == 1, fcdis_array(dx, dy, c), 0.0) + \
+        np.where(m_con == 2, 0.1 * fcdis_array(dx, dy, 0.0), 0.0)
+    evaluator = float(values.sum())
+
+    return evaluator
+
+def spaces_overlap_fast(spaces, boundaries):
+    """
+    Computes the Spaces Overlap Evaluator using rectangle arithmetic for the
+    overlap among floors, and the cached rectangles (or Shapely Polygons) of 
+    the adjacent buildings whose bounding rectangle overlaps each floor.
+    """
+    ov_values = []
+
+    # Computes the overlap among floors
+    if spaces[0].grid is not None:
+        ov_values.append(int(overlap_grid(spaces).sum()) / MM**2)
+    else:
+        areas = pairwise_overlap(floor_array(spaces))
+        ov_values.extend([round_area(float(x)) for x in areas[areas > 0]])
+
+    # Computes the overlap between spaces and the adjacent buildings
+    for adjacent in boundaries['adjacent']:
+        shape, rectangles = adjacent.decompose()
+
+        for space in spaces:
+            # Skips the floors outside the adjacent bounding rectangle
+            if rectangle_overlap(space, adjacent) == 0:
+                continue
+
+            if rectangles is not None:
+                floor = np.array([space.position[0], space.position[1],
+                                  space.width, space.height])
+                area = float(rectilinear_overlap(floor, rectangles))
+            else:
+                area = shape.intersection(
+                    ShpPolygon(space.geometry.points)).area
+            if area > 0:
+                ov_values.append(round_area(area))
+
+    evaluator = sum(ov_values)
+
+    return evaluator
+
+def floor_dimensions_fast(spaces, design_data):
+    """
+    Computes the Floor Dimensions Evaluator from the floor width and height
+    instead of the polygon area.
+    """
+    missing_areas = []
+
+    for i in range(len(spaces)):
+        if design_data.m_far[i] is None:
+            continue
+
+        if spaces[i].grid is not None:
+            space_area = int(spaces[i].grid[2]) * int(spaces[i].grid[3]) \
+                / MM**2
+        else:
+            space_area = spaces[i].width * spaces[i].height
+        if design_data.m_far[i] > space_area:
+            missing_areas.append(design_data.m_far[i] - space_area)
+
+    evaluator = sum(missing_areas)
+
+    return evaluator
+
+def compactness_fast(spaces, boundaries):
+    """
+    Computes the Compactness Evaluator by clipping the floors against the 
+    rectangles of the building boundary, falling back to the cached Shapely 
+    Polygon if the boundary isn't rectilinear.
+    """
+    building = boundaries['building'][0]
+    boundary_area = round_area(building.geometry.area)
+    shape, rectangles = building.decompose()
+
+    def inside_area(floors):
+        # Computes the area of every floor inside the building boundary
+        if rectangles is not None:
+            return rectilinear_overlap(floors, rectangles)
+        return np.array([
+            shape.intersection(box(x, y, x + w, y + h)).area
+            for x, y, w, h in floors.reshape(-1, 4)
+            ])
+
+    # Computes the overlap between every space and the building boundary
+    floors = floor_array(spaces)
+    ov_building = [round_area(float(x)) for x in inside_area(floors) if x > 0]
+
+    # Computes the overlap between the spaces that lies within the building
+    if spaces[0].grid is not None:
+        areas = overlap_grid(spaces)
+    else:
+        areas = pairwise_overlap(floors)
+
+    # In fixed-point mode every pair of spaces is counted once
+    if spaces[0].grid is not None:
+        areas = np.triu(areas)
+
+    ov_spaces = []
+    for i, j in zip(*np.nonzero(areas)):
+        x_0 = max([floors[i, 0], floors[j, 0]])
+        y_0 = max([floors[i, 1], floors[j, 1]])
+        x_1 = min([floors[i, 0] + floors[i, 2], floors[j, 0] + floors[j, 2]])
+        y_1 = min([floors[i, 1] + floors[i, 3], floors[j, 1] + floors[j, 3]])
+        intersection = np.array([[x_0, y_0, x_1 - x_0, y_1 - y_0]])
+        if inside_area(intersection)[0] > 0:
+            if spaces[0].grid is not None:
+                ov_spaces.append(int(areas[i, j]))
+            else:
+                ov_spaces.append(round_area(float(areas[i, j])))
+
+    # Prunes the duplicate values in the spaces list
+    if spaces[0].grid is not None:
+        ov_spaces = sum(ov_spaces) / MM**2
+    else:
+        ov_spaces = sum(set(ov_spaces))
+
+    evaluator = boundary_area - sum(ov_building) - ov_spaces
+
+    return evaluator
+
+def overflow_fast(spaces, boundaries, design_data):
+    """
+    Computes the Overflow Evaluator by clipping the floors against the 
+    rectangles of the deflated building boundary, falling back to the 
+    reference evaluator if the boundary isn't rectilinear.
+    """
+    offset_distance = design_data.t_ew - (0.5 * design_data.t_iw)
+    rectangles = boundaries['building'][0].deflate(offset_distance)[1]
+    if rectangles is None:
+        return overflow(spaces, boundaries, design_data)
+
+    # Computes the sum of all space areas for evaluation
+    if spaces[0].grid is not None:
+        space_area = sum([
+            int(space.grid[2]) * int(space.grid[3]) for space in spaces
+            ]) / MM**2
+    else:
+        space_area = sum([
+            round_area(space.width * space.height) for space in spaces
+            ])
+
+    # Computes the overlaps between the spaces and the deflated boundary
+    areas = rectilinear_overlap(floor_array(spaces), rectangles)
+    ov_building = [round_area(float(x)) for x in areas if x > 0]
+
+    evaluator = space_area - sum(ov_building)
+
+    return evaluator
+
+# Registry of the evaluator backends. The reference backend holds the original
+# Shapely and COMPAS evaluators, and the fast backend must produce the same 
+# values (see 'shadow_evaluate' in epsap.py to compare them)
+BACKENDS = {
+    'reference': {
+        'connectivity_and_adjacency': connectivity_and_adjacency,
+        'spaces_overlap': spaces_overlap,
+        'floor_dimensions': floor_dimensions,
+        'compactness': compactness,
+        'overflow': overflow
+        },
+    'fast': {
+        'connectivity_and_adjacency': connectivity_and_adjacency_fast,
+        'spaces_overlap': spaces_overlap_fast,
+        'floor_dimensions': floor_dimensions_fast,
+        'compactness': compactness_fast,
+        'overflow': overflow_fast
+        }
+    }
+
+def get_backend(name):
+    """
+    Gets the evaluators of a backend from the registry.
+    """
+    if name not in BACKENDS:
+        sys.exit("Unknown evaluator backend '{}', the available backends " \
+                 "are: {}.".format(name, ", ".join(BACKENDS.keys())))
+
+    return BACKENDS[name]
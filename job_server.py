@@ -0,0 +1,257 @@
+# Implements a local job server for the evolutionary program for space
+# allocation problem proposed by Rodrigues, E. et. al (2013).
+#
+# The server accepts layout jobs as JSON lines over a TCP or Unix socket,
+# queues them onto a bounded pool of worker processes and streams the
+# snapshot of every generation back to the client. Worker processes are
+# long-lived, so the imports and the parsed sites are kept between jobs.
+#
+# A job is a single JSON line with the following keys:
+# - 'dxf': the contents of the DXF file as text;
+# - 'design_data': the design data matrices (m_sn, m_con, m_dim, ...), 
+#   including the optional boundary matrix (m_bnd) for multi-floor jobs;
+# - 'weights': the list of evaluator weights;
+# - 'k', 'elite_size', 'generations', 'screening', 'fixed_point', 'repair',
+#   'local_search', 'adaptive', 'target_fitness', 'patience', 'backend',
+#   'shadow_fraction': optional run parameters;
+#
+# Author: Vinicius Mizobuti
+#
+# Current Version: 1.0.0
+# Release Date: WIP - 03/13/2022
+
+import io
+import sys
+import json
+import queue
+import types
+import asyncio
+import hashlib
+import argparse
+import multiprocessing
+import ezdxf
+
+from concurrent.futures import ProcessPoolExecutor
+
+import epsap
+
+# Number of parsed sites kept by every worker process
+SITE_CACHE_SIZE = 16
+
+# Maximum size of a job line in bytes, given that the job carries the whole
+# DXF file
+JOB_SIZE_LIMIT = 256 * 1024 * 1024
+
+# Parsed sites of the current worker process, keyed by the DXF hash
+_sites = {}
+
+def warm_worker():
+    """
+    Initializes a worker process. Importing this module already imports the
+    heavy dependencies (ezdxf, COMPAS, Shapely and NumPy), so the only work
+    left is to reset the site cache.
+    """
+    _sites.clear()
+
+    return
+
+def load_site(dxf_text):
+    """
+    Parses the DXF contents into boundaries, reusing the boundaries of a
+    previous job if the same DXF was already parsed by this worker.
+    """
+    key = hashlib.sha1(dxf_text.encode()).hexdigest()
+
+    if key not in _sites:
+        # Discards the oldest site if the cache is full
+        if len(_sites) >= SITE_CACHE_SIZE:
+            del _sites[next(iter(_sites))]
+
+        dxf_file = ezdxf.read(io.StringIO(dxf_text))
+        _sites[key] = epsap.read_boundaries(dxf_file)
+
+    return _sites[key]
+
+def serialize_snapshot(snapshot):
+    """
+    Converts the NumPy arrays of a snapshot to lists so it can be sent as
+    JSON.
+    """
+    message = dict(snapshot)
+    message['floors'] = snapshot['floors'].tolist()
+    message['openings'] = snapshot['openings'].tolist()
+
+    return message
+
+def run_job(job, progress, cancel=None):
+    """
+    Runs a job on a worker process. The snapshot of every generation is put
+    on the progress queue, followed by None when the job ends. The job stops
+    as soon as the cancel event is set (see 'epsap.run').
+    """
+    try:
+        boundaries = load_site(job['dxf'])
+        design_data = types.SimpleNamespace(**job['design_data'])
+
+        snapshot = None
+        for snapshot in epsap.run(design_data, boundaries, job['weights'],
+                                  k=job.get('k', 10),
+                                  elite_size=job.get('elite_size', 15),
+                                  generations=job.get('generations', 100),
+                                  screening=job.get('screening', False),
+                                  fixed_point=job.get('fixed_point', False),
+                                  repair=job.get('repair', False),
+                                  local_search=job.get('local_search', 0),
+                                  adaptive=job.get('adaptive', False),
+                                  target_fitness=job.get('target_fitness'),
+                                  patience=job.get('patience'),
+                                  backend=job.get('backend', 'reference'),
+                                  shadow_fraction=job.get('shadow_fraction',
+                                                          0.0),
+                                  cancel=cancel):
+            progress.put(serialize_snapshot(snapshot))
+    finally:
+        progress.put(None)
+
+    return serialize_snapshot(snapshot)
+
+class JobServer:
+
+    def __init__(self, workers):
+        """
+        Initialize a job server.
+        A job server has:
+        - 'workers': the maximum number of jobs running at the same time;
+        - 'executor': the pool of worker processes;
+        - 'manager': the multiprocessing manager that owns the progress 
+                     queues and the cancel events of the jobs;
+        - 'jobs': the number of jobs received so far, used as job id;
+        """
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers,
+                                            initializer=warm_worker)
+        self.manager = multiprocessing.Manager()
+        self.jobs = 0
+
+    def warm_up(self):
+        """
+        Starts the worker processes ahead of the first job.
+        """
+        for i in range(self.workers):
+            self.executor.submit(warm_worker)
+
+        return
+
+    async def send(self, writer, message):
+        """
+        Sends a message to the client as a JSON line.
+        """
+        writer.write((json.dumps(message) + '\n').encode())
+        await writer.drain()
+
+        return
+
+    async def handle_client(self, reader, writer):
+        """
+        Receives a job from a client, queues it on the worker pool and streams
+        its progress and result back. If the client disconnects, the job is
+        cancelled, whether it is still queued or already running.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Reads and validates the job
+        try:
+            job = json.loads(await reader.readline())
+            for key in ['dxf', 'design_data', 'weights']:
+                if key not in job:
+                    raise ValueError("Job is missing the '{}' key.".format(key))
+        except ValueError as error:
+            await self.send(writer, {'status': 'error', 'error': str(error)})
+            writer.close()
+            return
+
+        self.jobs += 1
+        job_id = self.jobs
+        await self.send(writer, {'job': job_id, 'status': 'queued'})
+
+        # Submits the job to the worker pool
+        progress = self.manager.Queue()
+        cancel = self.manager.Event()
+        future = loop.run_in_executor(self.executor, run_job, job, progress,
+                                      cancel)
+
+        try:
+            # Streams the snapshots until the job ends
+            while True:
+                try:
+                    snapshot = await loop.run_in_executor(None, progress.get,
+                                                          True, 0.5)
+                except queue.Empty:
+                    if future.done():
+                        break
+                    continue
+
+                if snapshot is None:
+                    break
+
+                await self.send(writer, {'job': job_id, 'status': 'running',
+                                         'snapshot': snapshot})
+
+            # Sends the result of the job
+            try:
+                result = await future
+                message = {'job': job_id, 'status': 'done', 
+                           'snapshot': result}
+            except (Exception, SystemExit) as error:
+                message = {'job': job_id, 'status': 'error', 
+                           'error': str(error)}
+            await self.send(writer, message)
+        except ConnectionError:
+            # Cancels the job, as no one is left to receive its result
+            cancel.set()
+        finally:
+            writer.close()
+
+        return
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        """
+        Serves jobs on a Unix socket if a path is given, otherwise on TCP.
+        """
+        self.warm_up()
+
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_client,
+                                                     path=path,
+                                                     limit=JOB_SIZE_LIMIT)
+        else:
+            server = await asyncio.start_server(self.handle_client,
+                                                host=host, port=port,
+                                                limit=JOB_SIZE_LIMIT)
+
+        async with server:
+            await server.serve_forever()
+
+        return
+
+def main():
+
+    parser = argparse.ArgumentParser(description="EPSAP local job server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', default=None,
+                        help="Unix socket path, used instead of TCP.")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Maximum number of jobs running at once.")
+    args = parser.parse_args()
+
+    if args.workers <= 0:
+        sys.exit("Number of workers must be larger than zero.")
+
+    server = JobServer(args.workers)
+    asyncio.run(server.serve(args.host, args.port, args.socket))
+
+    return
+
+if __name__ == '__main__':
+    main()
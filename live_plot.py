@@ -0,0 +1,161 @@
+# Implements a live view of the runs of the evolutionary program for space
+# allocation problem proposed by Rodrigues, E. et. al (2013).
+#
+# The site (building and adjacent boundaries) is drawn once, and only the
+# floors of the best individual are updated in place with the snapshots of
+# the run. The run goes on in a background thread, so the evolution never
+# waits for the plot, and the plot is redrawn at most at the target frame
+# rate with the latest snapshot received.
+#
+# Author: Vinicius Mizobuti
+#
+# Current Version: 1.0.0
+# Release Date: WIP - 03/13/2022
+
+import time
+import threading
+import matplotlib.pyplot as plt
+
+from compas.geometry import Polygon
+from compas_plotters import Plotter
+from compas.colors import Color
+
+import epsap
+
+class LivePlot:
+
+    def __init__(self, boundaries, fps=10):
+        """
+        Initialize a live plot.
+        A live plot has:
+        - 'plotter': the COMPAS plotter holding the site and the spaces;
+        - 'interval': the minimum time between redraws, in seconds;
+        - 'artists': the polygon artists of the spaces, created with the first
+                     snapshot;
+        - 'snapshot': the latest snapshot received and not drawn yet;
+        - 'lock': the lock guarding the latest snapshot;
+        """
+        self.plotter = Plotter()
+        self.interval = 1.0 / fps
+        self.artists = []
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+        # Draws the site once, it doesn't change during the run
+        for adjacent in boundaries['adjacent']:
+            self.plotter.add(adjacent.geometry,
+                             linewidth=1,
+                             edgecolor=Color.red(),
+                             fill=False)
+
+        for boundary in boundaries['building']:
+            self.plotter.add(boundary.geometry,
+                             linewidth=2,
+                             edgecolor=Color.black(),
+                             fill=False)
+
+        self.plotter.zoom_extents()
+
+    def update(self, snapshot):
+        """
+        Keeps the snapshot to be drawn on the next frame, replacing any
+        snapshot not drawn yet. Returns immediately, so it can be called from
+        the evolution loop.
+        """
+        with self.lock:
+            self.snapshot = snapshot
+
+        return
+
+    def is_open(self):
+        """
+        Checks if the plot window is still open.
+        """
+        return plt.fignum_exists(self.plotter.figure.number)
+
+    def draw(self):
+        """
+        Moves the floors of the spaces to the ones of the latest snapshot. The
+        space artists are created with the first snapshot and only updated
+        afterwards. Returns False if there was no new snapshot to draw.
+        """
+        with self.lock:
+            snapshot = self.snapshot
+            self.snapshot = None
+
+        if snapshot is None:
+            return False
+
+        for i in range(len(snapshot['floors'])):
+            x_coord, y_coord, width, height = snapshot['floors'][i]
+            polygon = Polygon([[x_coord, y_coord, 0],
+                               [x_coord + width, y_coord, 0],
+                               [x_coord + width, y_coord + height, 0],
+                               [x_coord, y_coord + height, 0]])
+
+            if i < len(self.artists):
+                self.artists[i].polygon = polygon
+                self.artists[i].redraw()
+            else:
+                self.artists.append(self.plotter.add(polygon,
+                                                     linewidth=1,
+                                                     edgecolor=Color.blue(),
+                                                     fill=False))
+
+        self.plotter.axes.set_title("Generation {}: {} ({:.4f})".format(
+            snapshot['generation'], snapshot['best_label'],
+            snapshot['best_fitness']))
+        self.plotter.figure.canvas.draw_idle()
+
+        return True
+
+def watch(design_data, boundaries, weights, fps=10, **parameters):
+    """
+    Runs the evolutionary program (see 'epsap.run', which receives the 
+    remaining parameters) and watches it live. The run goes on in a 
+    background thread, while the plot is redrawn on the main thread at most 
+    'fps' times per second. Closing the window cancels the run, which stops
+    in the middle of the current generation. Errors raised by the run are 
+    raised again here. Returns the last snapshot of the run.
+    """
+    live = LivePlot(boundaries, fps)
+    cancel = threading.Event()
+    result = {'snapshot': None, 'error': None}
+
+    def consume():
+        # Runs the evolution, handing every snapshot to the plot
+        try:
+            for snapshot in epsap.run(design_data, boundaries, weights, 
+                                      cancel=cancel, **parameters):
+                result['snapshot'] = snapshot
+                live.update(snapshot)
+        except BaseException as error:
+            result['error'] = error
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+
+    plt.show(block=False)
+
+    # Redraws the plot at the target frame rate until the run ends
+    while consumer.is_alive():
+        frame_start = time.perf_counter()
+        live.draw()
+
+        if live.is_open() == False:
+            cancel.set()
+            break
+
+        elapsed_time = time.perf_counter() - frame_start
+        plt.pause(max([live.interval - elapsed_time, 0.001]))
+
+    consumer.join()
+    if result['error'] is not None:
+        raise result['error']
+
+    # Draws the final snapshot and keeps the window open
+    if live.is_open() == True:
+        live.draw()
+        plt.show()
+
+    return result['snapshot']
@@ -7,8 +7,11 @@
 # Release Date: WIP - 03/13/2022
 
 from math import sqrt
+import numpy as np
 import fitness_functions as ff
-from compas.geometry import Point, Polygon
+from shapely.geometry import Polygon as ShpPolygon
+from compas.geometry import Point, Polygon, offset_polygon
+from fitness_functions import MM
 
 class Boundary:
 
@@ -21,12 +24,16 @@ class Boundary:
         - 'width': the width of the boundary bounding rectangle;
         - 'height': the height of the boundary bounding rectangle;
         - 'position': the bottom-left vertex point coordinate (x, y);
+        - 'deflated': the deflated boundaries already computed, keyed by their
+                      offset distance;
+        - 'decomposed': the Shapely Polygon and rectangles of the boundary, 
+                        once computed;
         """
         self.geometry = polygon
-        self.boundary = self.bounding_rectangle()[0]
-        self.width = self.bounding_rectangle()[1]
-        self.height = self.bounding_rectangle()[2]
-        self.position = self.bounding_rectangle()[3]
+        self.boundary, self.width, self.height, self.position = \
+            self.bounding_rectangle()
+        self.deflated = {}
+        self.decomposed = None
     
     def bounding_rectangle(self):
         """
@@ -69,29 +76,96 @@ class Boundary:
 
         return bounding_line, bounding_width, bounding_height, position
 
+    def deflate(self, offset_distance):
+        """
+        Computes the boundary deflated by the offset distance and returns it as
+        a Shapely Polygon, together with its decomposition in rectangles (or 
+        None if the deflated boundary isn't rectilinear). The result is kept, 
+        so the offset is only computed once for every distance.
+        """
+        if offset_distance not in self.deflated:
+            points = offset_polygon(self.geometry.points, offset_distance)
+            self.deflated[offset_distance] = (
+                ShpPolygon(points), ff.rectilinear_decomposition(points)
+                )
+
+        return self.deflated[offset_distance]
+
+    def decompose(self):
+        """
+        Returns the boundary as a Shapely Polygon, together with its 
+        decomposition in rectangles (or None if the boundary isn't 
+        rectilinear). The result is kept, so it is only computed once.
+        """
+        if self.decomposed is None:
+            self.decomposed = (
+                ShpPolygon(self.geometry.points),
+                ff.rectilinear_decomposition(self.geometry.points)
+                )
+
+        return self.decomposed
+
 class Population:
 
-    def __init__(self, individual, size):
+    def __init__(self, individuals, size, elite_size):
         """
         Initialize a population of floorplans.
         A population has:
         - 'individuals': a list of individuals;
         - 'size': the fixed size of the population based on design data;
+        - 'elite_size': the number of individuals on the elite group;
         """
-        self.individual = individual
+        self.individuals = individuals
         self.size = size
+        self.elite_size = elite_size
     
-    def rank_individuals():
-        raise NotImplementedError
+    def rank_individuals(self):
+        """
+        Sorts the individuals by their fitness value. Given that the fitness 
+        value is a penalty, the best individual is the first in the list.
+        """
+        self.individuals.sort(key=lambda individual: individual.fitness_value)
+
+        return
     
-    def compute_elite_favg():
-        raise NotImplementedError
+    def compute_elite_favg(self):
+        """
+        Computes the average fitness value of the elite group. The population 
+        must be ranked before calling this function.
+        """
+        elite = self.individuals[:self.elite_size]
+        elite_favg = sum([x.fitness_value for x in elite]) / len(elite)
+
+        return elite_favg
     
-    def add_individual():
-        raise NotImplementedError
+    def compute_elite_worst(self):
+        """
+        Computes the fitness value of the worst individual on the elite group, 
+        that is, the value any new individual must beat to join the elite. The 
+        population must be ranked before calling this function.
+        """
+        elite = self.individuals[:self.elite_size]
+        elite_worst = elite[-1].fitness_value
+
+        return elite_worst
     
-    def purge():
-        raise NotImplementedError
+    def add_individual(self, individual):
+        """
+        Adds an individual to the population.
+        """
+        self.individuals.append(individual)
+
+        return
+    
+    def purge(self):
+        """
+        Ranks the population and removes the worst individuals until it has 
+        its fixed size.
+        """
+        self.rank_individuals()
+        del self.individuals[self.size:]
+
+        return
 
 class Individual:
 
@@ -104,39 +178,76 @@ class Individual:
         - 'fitness_value': the computed fitness value associated with the 
                            individual. This value is used to guarantee that a 
                            solution is reached;
+        - 'evaluators': the values of the evaluators f1, f2, f3, f5, f6 and 
+                        f7 computed along with the fitness value;
         """
         self.label = label
         self.spaces = spaces
         self.fitness_value = 0.0
+        self.evaluators = None
     
-    def compute_fitness_value(self, boundaries, design_data, weights):
+    def compute_fitness_value(self, boundaries, design_data, weights,
+                              backend='reference'):
         """
         Computes the fitness value of the individual based on the seven
-        evaluators proposed by Rodrigues, E. et al.
+        evaluators proposed by Rodrigues, E. et al., using the evaluators of
+        the given backend (see 'BACKENDS' in fitness_functions.py).
+        """
+        values = self.compute_evaluator_values(boundaries, design_data,
+                                               backend)
+        self.apply_evaluator_values(values, weights)
+
+        return
+
+    def compute_evaluator_values(self, boundaries, design_data,
+                                 backend='reference'):
         """
+        Computes the values of the evaluators f1, f2, f3, f5, f6 and f7 of 
+        the individual before their square roots are taken, so that the 
+        values of several sub-problems can be summed.
+        """
+        evaluators = ff.get_backend(backend)
+
         # Computes the Connectivity/Adjacency Evaluator
-        f1 = ff.connectivity_and_adjacency(self.spaces, design_data)
+        f1 = evaluators['connectivity_and_adjacency'](self.spaces, design_data)
 
         # Computes the Spaces Overlap Evaluator
-        f2 = sqrt(ff.spaces_overlap(self.spaces, boundaries))
+        f2 = evaluators['spaces_overlap'](self.spaces, boundaries)
 
         # Computes the Openings Overlap Evaluator
-        f3 = sqrt(ff.openings_overlap(self.spaces, design_data))
+        f3 = ff.openings_overlap(self.spaces, design_data)
 
         # # Computes the Opening Orientation Evaluator
         # # This evaluator is currently unused, given that the create_spaces
         # # function always assumes the orientation from the matrix unless
         # # None is given.
-        # f4 = sqrt(ff.opening_orientation(self.spaces, design_data))
+        # f4 = ff.opening_orientation(self.spaces, design_data)
 
         # Computes the Floor Dimensions Evaluator
-        f5 = sqrt(ff.floor_dimensions(self.spaces, design_data))
+        f5 = evaluators['floor_dimensions'](self.spaces, design_data)
 
         # Computes the Compactness Evaluator
-        f6 = sqrt(ff.compactness(self.spaces, boundaries))
+        f6 = evaluators['compactness'](self.spaces, boundaries)
 
         # Computes the Overflow Evaluator
-        f7 = sqrt(ff.overflow(self.spaces, boundaries, design_data))
+        f7 = evaluators['overflow'](self.spaces, boundaries, design_data)
+
+        return [f1, f2, f3, f5, f6, f7]
+
+    def apply_evaluator_values(self, values, weights):
+        """
+        Computes the fitness value of the individual from the values given by
+        'compute_evaluator_values'. The area-based evaluators are clipped to 
+        zero before their square roots are taken, given that the overlaps are 
+        rounded and that the spaces may cover more than the building boundary 
+        area.
+        """
+        f1 = values[0]
+        f2 = sqrt(max([0.0, values[1]]))
+        f3 = sqrt(values[2])
+        f5 = sqrt(values[3])
+        f6 = sqrt(max([0.0, values[4]]))
+        f7 = sqrt(max([0.0, values[5]]))
 
         # Computes the weighted values of the evaluators
         weighted_values = [
@@ -149,10 +260,64 @@ class Individual:
             ]
 
         # Computes the individual's fitness value
+        self.evaluators = [f1, f2, f3, f5, f6, f7]
         self.fitness_value = sum(weighted_values)
 
         return
 
+    def compute_fitness_bound(self, boundaries, design_data, weights):
+        """
+        Computes a lower bound of the individual's fitness value using only
+        the bounding rectangles of the spaces and the building boundary. The
+        bound is cheap to compute and never exceeds the exact fitness value,
+        so an individual whose bound is worse than the elite can be discarded
+        without computing the exact evaluators.
+        """
+        # Computes the Connectivity/Adjacency Evaluator, which is already
+        # based on the floor rectangles
+        f1 = ff.connectivity_and_adjacency(self.spaces, design_data)
+
+        # Computes the bounds of the remaining evaluators
+        f2 = sqrt(ff.spaces_overlap_bound(self.spaces, boundaries))
+        f3 = sqrt(ff.openings_overlap(self.spaces, design_data))
+        f5 = sqrt(ff.floor_dimensions_bound(self.spaces, design_data))
+        f6 = sqrt(ff.compactness_bound(self.spaces, boundaries))
+        f7 = sqrt(ff.overflow_bound(self.spaces, boundaries, design_data))
+
+        # Computes the weighted values of the evaluators
+        weighted_values = [
+            weights[0] * f1,
+            weights[1] * f2,
+            weights[2] * f3,
+            weights[3] * f5,
+            weights[4] * f6,
+            weights[5] * f7
+            ]
+
+        # Computes the lower bound of the individual's fitness value
+        fitness_bound = sum(weighted_values)
+
+        return fitness_bound
+
+    def genome_key(self):
+        """
+        Returns the fixed-point genome of the individual as bytes, that is, the
+        floor grids followed by the opening positions in thousandths. Two 
+        individuals have the same key only if their genomes are equal, so the 
+        key can be used for exact comparison and hashing. Returns None if the 
+        individual wasn't created in fixed-point mode.
+        """
+        if self.spaces[0].grid is None:
+            return None
+
+        grid = np.array([space.grid for space in self.spaces], dtype=np.int32)
+        openings = np.array([
+            round(opening.position * MM) for space in self.spaces 
+            for opening in space.windows + space.doors
+            ], dtype=np.int32)
+
+        return grid.tobytes() + openings.tobytes()
+
 class Space:
 
     def __init__(self, label, floor, windows, doors, preferences=None):
@@ -170,6 +335,7 @@ class Space:
                       inherited from the space floor;
         - 'width': the width inherited from the space floor;
         - 'height': the height inherited from the space floor;
+        - 'grid': the fixed-point grid inherited from the space floor;
         """
         self.label = label
         self.floor = floor
@@ -180,6 +346,7 @@ class Space:
         self.position = self.floor.position
         self.width = self.floor.width
         self.height = self.floor.height
+        self.grid = self.floor.grid
 
 class Window:
 
@@ -219,18 +386,21 @@ class Door:
 
 class Floor:
 
-    def __init__(self, position, width, height):
+    def __init__(self, position, width, height, grid=None):
         """
         Initialize a space floor.
         A space floor has four DOF and is composed of:
         - 'position': the bottom-left vertex point coordinate (x, y);
         - 'width': the floor width (constrained by user-defined limits);
         - 'height': the floor height (constrained by user-defined limits);
+        - 'grid': the int32 array (x, y, width, height) in millimetres, used 
+                  in the fixed-point mode. The default value is None;
         - 'geometry': the COMPAS Polygon representing the floor;
         """
         self.position = position
         self.width = width
         self.height = height
+        self.grid = grid
         self.geometry = self.floor_geometry(self.position, 
                                             self.width, self.height)
 
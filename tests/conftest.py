@@ -0,0 +1,20 @@
+# Shared fixtures for the tests of the evolutionary program for space
+# allocation problem proposed by Rodrigues, E. et. al (2013).
+
+import os
+import sys
+import pytest
+
+# Makes the modules on the repository root importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope='session')
+def site():
+    """
+    Reads the building and adjacent boundaries of the validation site.
+    """
+    import epsap
+
+    return epsap.create_boundaries(os.path.join(ROOT, 'DXF',
+                                                'validation_test.dxf'))
@@ -0,0 +1,96 @@
+# Tests that the 'fast' evaluator backend gives the same values as the
+# 'reference' one, up to the rounding of the areas to three decimals.
+
+import pytest
+
+from compas.geometry import Point, Polygon
+
+import epsap
+import fitness_functions as ff
+import design_data.first_validation_test as dd
+from space_classes import Boundary
+
+WEIGHTS = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+EVALUATORS = list(ff.BACKENDS['reference'].keys())
+
+# The backends may round an area that falls halfway between two rounded
+# values differently, by 0.001, which can only happen on a few areas of an
+# individual
+TOLERANCE = 0.01
+
+def evaluate(backend, name, spaces, boundaries):
+    evaluator = ff.BACKENDS[backend][name]
+    if name == 'connectivity_and_adjacency' or name == 'floor_dimensions':
+        return evaluator(spaces, dd)
+    elif name == 'overflow':
+        return evaluator(spaces, boundaries, dd)
+    else:
+        return evaluator(spaces, boundaries)
+
+@pytest.fixture(scope='module')
+def slanted_site(site):
+    """
+    Replaces the building and adjacent boundaries of the validation site by
+    polygons that aren't rectilinear, so the fast backend falls back to 
+    Shapely.
+    """
+    building = Polygon([Point(0, 0, 0), Point(10, 0, 0), Point(12, 14, 0),
+                        Point(1, 13, 0)])
+    adjacent = Polygon([Point(12, -2, 0), Point(20, -2, 0),
+                        Point(20, 10, 0), Point(13, 8, 0)])
+
+    return {'building': [Boundary(building)],
+            'adjacent': [Boundary(adjacent)]}
+
+def individuals(boundaries, fixed_point, count=40):
+    population = []
+    for i in range(count):
+        population.append(epsap.create_individual(
+            '0.{:02d}'.format(i), dd, boundaries, WEIGHTS, fixed_point,
+            repair=(i % 2 == 1), evaluate=False))
+
+    return population
+
+@pytest.mark.parametrize('name', EVALUATORS)
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_fast_evaluator_matches_reference(site, name, fixed_point):
+    for individual in individuals(site, fixed_point):
+        reference = evaluate('reference', name, individual.spaces, site)
+        fast = evaluate('fast', name, individual.spaces, site)
+
+        assert fast == pytest.approx(reference, abs=TOLERANCE)
+
+@pytest.mark.parametrize('name', EVALUATORS)
+def test_fast_evaluator_matches_reference_off_grid(slanted_site, name):
+    for individual in individuals(slanted_site, False):
+        reference = evaluate('reference', name, individual.spaces,
+                             slanted_site)
+        fast = evaluate('fast', name, individual.spaces, slanted_site)
+
+        assert fast == pytest.approx(reference, abs=TOLERANCE)
+
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_backends_mostly_agree_exactly(site, fixed_point):
+    mismatches = 0
+    population = individuals(site, fixed_point, 300)
+    for individual in population:
+        individual.compute_fitness_value(site, dd, WEIGHTS, 'reference')
+        reference = individual.evaluators
+        individual.compute_fitness_value(site, dd, WEIGHTS, 'fast')
+        if individual.evaluators != pytest.approx(reference, abs=1e-9):
+            mismatches += 1
+
+    assert mismatches < 0.1 * len(population)
+
+def test_shadow_report(site):
+    report = epsap.create_shadow_report(1.0)
+    for individual in individuals(site, False, 5):
+        epsap.shadow_evaluate(individual, dd, site, report)
+
+    summary = epsap.summarize_shadow_report(report)
+
+    assert set(summary.keys()) == set(EVALUATORS)
+    for stats in summary.values():
+        assert stats['samples'] == 5
+        assert stats['max_difference'] <= TOLERANCE
@@ -0,0 +1,72 @@
+# Tests that the fitness bound used to screen offspring never exceeds the
+# exact fitness value.
+
+import pytest
+
+from numpy.random import default_rng
+
+import epsap
+import fitness_functions as ff
+import design_data.first_validation_test as dd
+
+WEIGHTS = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+# The bounds sum their terms in a different order than the exact evaluators
+TOLERANCE = 1e-9
+
+BOUNDS = [
+    ('spaces_overlap', ff.spaces_overlap_bound),
+    ('compactness', ff.compactness_bound),
+    ('overflow', ff.overflow_bound)
+    ]
+
+def assert_bounded(individual, site):
+    bound = individual.compute_fitness_bound(site, dd, WEIGHTS)
+    individual.compute_fitness_value(site, dd, WEIGHTS)
+
+    assert bound <= individual.fitness_value + TOLERANCE
+
+def evaluate(name, evaluator, spaces, site):
+    if name == 'overflow':
+        return evaluator(spaces, site, dd)
+
+    return evaluator(spaces, site)
+
+@pytest.mark.parametrize('repair', [False, True])
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_bound_of_new_individuals(site, fixed_point, repair):
+    for i in range(200):
+        individual = epsap.create_individual('0.01', dd, site, WEIGHTS,
+                                             fixed_point, repair, 
+                                             evaluate=False)
+        assert_bounded(individual, site)
+
+@pytest.mark.parametrize('repair', [False, True])
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_bound_of_mutated_offspring(site, fixed_point, repair):
+    rng = default_rng(0)
+    parents = [
+        epsap.create_individual('0.{:02d}'.format(i), dd, site, WEIGHTS,
+                                fixed_point, repair)
+        for i in range(20)
+        ]
+
+    for i in range(600):
+        offspring = epsap.mutate_individual('1.01', parents[i % 20], dd, rng)
+        if repair == True:
+            offspring.spaces = epsap.repair_spaces(offspring.spaces, site, dd)
+        assert_bounded(offspring, site)
+
+@pytest.mark.parametrize('name, bound', BOUNDS)
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_evaluator_bounds(site, fixed_point, name, bound):
+    rng = default_rng(1)
+    for i in range(200):
+        individual = epsap.create_individual('0.01', dd, site, WEIGHTS,
+                                             fixed_point, evaluate=False)
+        spaces = epsap.mutate_individual('1.01', individual, dd, rng).spaces
+        exact = evaluate(name, ff.BACKENDS['reference'][name], spaces, site)
+
+        value = evaluate(name, bound, spaces, site)
+
+        assert value <= max([0.0, exact]) + TOLERANCE
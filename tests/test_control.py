@@ -0,0 +1,96 @@
+# Tests the stopping criteria and the adaptive population size of a run.
+
+import logging
+import pytest
+
+import epsap
+import design_data.first_validation_test as dd
+from space_classes import Population
+
+WEIGHTS = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+def create_elite(site, diverse):
+    """
+    Creates a population of size 20 with an elite group of 5 individuals,
+    either all different or all copies of the same individual.
+    """
+    if diverse == True:
+        individuals = [
+            epsap.create_individual('0.{:02d}'.format(i), dd, site, WEIGHTS)
+            for i in range(5)
+            ]
+    else:
+        individuals = [epsap.create_individual('0.01', dd, site, WEIGHTS)] * 5
+
+    population = Population(individuals, 20, 5)
+    population.rank_individuals()
+
+    return population
+
+def test_stops_when_target_is_reached(site):
+    population = create_elite(site, True)
+    best_fitness = population.individuals[0].fitness_value
+
+    assert epsap.control_run(population, 1, [10.0, 9.0], site['building'][0],
+                             target_fitness=best_fitness) == 'target'
+    assert epsap.control_run(population, 1, [10.0, 9.0], site['building'][0],
+                             target_fitness=best_fitness - 1) is None
+
+def test_stops_when_elite_stagnates(site):
+    population = create_elite(site, True)
+    boundary = site['building'][0]
+
+    assert epsap.control_run(population, 3, [10.0, 10.0, 9.9999, 9.9999],
+                             boundary, patience=3) == 'stagnation'
+    assert epsap.control_run(population, 3, [10.0, 10.0, 9.0, 9.0],
+                             boundary, patience=3) is None
+    assert epsap.control_run(population, 1, [10.0, 10.0], boundary,
+                             patience=3) is None
+
+def test_grows_when_elite_is_stuck(site):
+    population = create_elite(site, False)
+
+    epsap.control_run(population, 1, [10.0, 10.0], site['building'][0],
+                      adaptive=True)
+
+    assert population.size == 30
+
+def test_shrinks_only_above_shrink_threshold(site):
+    population = create_elite(site, True)
+    boundary = site['building'][0]
+
+    # Improves by 2%, which is above the tolerance but below the threshold
+    epsap.control_run(population, 1, [10.0, 9.8], boundary, adaptive=True)
+    assert population.size == 20
+
+    epsap.control_run(population, 2, [10.0, 9.0], boundary, adaptive=True)
+    assert population.size == 15
+
+    epsap.control_run(population, 3, [10.0, 9.8], boundary, adaptive=True,
+                      shrink_threshold=0.01)
+    assert population.size == 11
+
+def test_resize_is_limited(site):
+    population = create_elite(site, False)
+    boundary = site['building'][0]
+
+    epsap.control_run(population, 1, [10.0, 10.0], boundary, adaptive=True,
+                      max_size=25)
+    assert population.size == 25
+
+    epsap.control_run(population, 2, [10.0, 5.0], boundary, adaptive=True,
+                      min_size=25)
+    assert population.size == 25
+
+def test_logs_every_decision(site, caplog):
+    population = create_elite(site, True)
+    boundary = site['building'][0]
+
+    with caplog.at_level(logging.INFO, logger=epsap.logger.name):
+        epsap.control_run(population, 1, [10.0, 9.8], boundary,
+                          adaptive=True)
+        epsap.control_run(population, 2, [10.0, 9.0], boundary,
+                          adaptive=True)
+
+    assert 'keeping the population size 20' in caplog.messages[0]
+    assert 'from 20 to 15' in caplog.messages[1]
@@ -0,0 +1,97 @@
+# Tests the decomposition of rectilinear boundaries in rectangles and the
+# overlap of floors against them, comparing both with Shapely.
+
+import pytest
+import numpy as np
+
+from shapely.geometry import Polygon as ShpPolygon, box
+from shapely.ops import unary_union
+from compas.geometry import Point, Polygon, offset_polygon
+
+import fitness_functions as ff
+
+# Concave rectilinear footprints, counter-clockwise
+FOOTPRINTS = {
+    'L': [(0, 0), (10, 0), (10, 4), (4, 4), (4, 12), (0, 12)],
+    'U': [(0, 0), (12, 0), (12, 9), (8, 9), (8, 3), (4, 3), (4, 9), (0, 9)],
+    'T': [(3, 0), (7, 0), (7, 6), (10, 6), (10, 9), (0, 9), (0, 6), (3, 6)],
+    'stairs': [(0, 0), (9, 0), (9, 3), (6, 3), (6, 6), (3, 6), (3, 9),
+               (0, 9)],
+    'H': [(0, 0), (3, 0), (3, 4), (7, 4), (7, 0), (10, 0), (10, 10),
+          (7, 10), (7, 6), (3, 6), (3, 10), (0, 10)]
+    }
+
+def compas_points(coordinates):
+    return [Point(x, y, 0) for x, y in coordinates]
+
+def assert_decomposition(points):
+    """
+    Checks that the rectangles are disjoint and cover exactly the polygon.
+    """
+    polygon = ShpPolygon([(p[0], p[1]) for p in points])
+    rectangles = ff.rectilinear_decomposition(points)
+    assert rectangles is not None
+
+    boxes = [box(*x) for x in rectangles]
+    areas = (rectangles[:, 2] - rectangles[:, 0]) * \
+        (rectangles[:, 3] - rectangles[:, 1])
+    assert (areas > 0).all()
+    assert areas.sum() == pytest.approx(polygon.area, abs=1e-6)
+    assert unary_union(boxes).symmetric_difference(polygon).area == \
+        pytest.approx(0.0, abs=1e-6)
+
+    return rectangles
+
+@pytest.mark.parametrize('name', FOOTPRINTS.keys())
+def test_decomposition_matches_shapely_area(name):
+    assert_decomposition(compas_points(FOOTPRINTS[name]))
+
+@pytest.mark.parametrize('name', FOOTPRINTS.keys())
+def test_decomposition_ignores_closing_point_and_orientation(name):
+    coordinates = FOOTPRINTS[name]
+    closed = assert_decomposition(compas_points(coordinates + 
+                                                [coordinates[0]]))
+    clockwise = assert_decomposition(compas_points(coordinates[::-1]))
+
+    assert closed.shape == clockwise.shape
+
+@pytest.mark.parametrize('name', FOOTPRINTS.keys())
+@pytest.mark.parametrize('distance', [0.15, 0.2, 0.35])
+def test_decomposition_of_deflated_footprint(name, distance):
+    # The offset leaves floating point noise on the vertex coordinates
+    points = offset_polygon(compas_points(FOOTPRINTS[name]), distance)
+
+    assert_decomposition(points)
+
+def test_decomposition_of_validation_site(site):
+    for boundary in site['building'] + site['adjacent']:
+        points = boundary.geometry.points
+        if ff.rectilinear_decomposition(points) is not None:
+            assert_decomposition(points)
+
+def test_decomposition_rejects_non_rectilinear_polygons():
+    trapezoid = compas_points([(0, 0), (10, 0), (8, 5), (2, 5)])
+    notched = compas_points([(0, 0), (10, 0), (10, 5), (5, 6), (0, 5)])
+
+    assert ff.rectilinear_decomposition(trapezoid) is None
+    assert ff.rectilinear_decomposition(notched) is None
+
+@pytest.mark.parametrize('name', FOOTPRINTS.keys())
+def test_overlap_matches_shapely_intersection(name):
+    polygon = ShpPolygon(FOOTPRINTS[name])
+    rectangles = ff.rectilinear_decomposition(compas_points(FOOTPRINTS[name]))
+
+    rng = np.random.default_rng(0)
+    floors = np.column_stack([rng.uniform(-2, 12, 200),
+                              rng.uniform(-2, 12, 200),
+                              rng.uniform(0.5, 6, 200),
+                              rng.uniform(0.5, 6, 200)])
+    expected = [polygon.intersection(box(x, y, x + w, y + h)).area
+                for x, y, w, h in floors]
+
+    areas = ff.rectilinear_overlap(floors, rectangles)
+    assert areas == pytest.approx(expected, abs=1e-9)
+
+    # A batch of individuals gives the same areas
+    batch = ff.rectilinear_overlap(floors.reshape(20, 10, 4), rectangles)
+    assert batch.ravel() == pytest.approx(expected, abs=1e-9)
@@ -0,0 +1,58 @@
+# Tests the generator-based run and its live view.
+
+import time
+import threading
+import pytest
+import numpy as np
+import matplotlib
+
+matplotlib.use('Agg')
+
+import epsap
+import live_plot
+import design_data.first_validation_test as dd
+
+WEIGHTS = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+@pytest.mark.parametrize('repair', [False, True])
+def test_run_yields_every_generation(site, repair):
+    snapshots = list(epsap.run(dd, site, WEIGHTS, k=1, elite_size=5,
+                               generations=2, repair=repair))
+
+    assert [x['generation'] for x in snapshots] == [0, 1, 2]
+    assert all([x['best_fitness'] >= 0 for x in snapshots])
+
+def test_cancel_stops_run_within_generation(site):
+    cancel = threading.Event()
+    timer = threading.Timer(0.5, cancel.set)
+    timer.start()
+
+    start_time = time.perf_counter()
+    snapshots = list(epsap.run(dd, site, WEIGHTS, k=10, elite_size=15,
+                               cancel=cancel))
+    timer.join()
+
+    # Generation zero alone evaluates 2250 individuals
+    assert snapshots == []
+    assert time.perf_counter() - start_time < 5.0
+
+def test_live_plot_moves_space_artists(site):
+    live = live_plot.LivePlot(site)
+    snapshot = {'generation': 0, 'best_label': '0.01', 'best_fitness': 1.0,
+                'floors': np.array([[0, 0, 2, 3], [1, 1, 1, 1]], dtype=float)}
+
+    live.update(snapshot)
+    assert live.draw() == True
+    assert live.draw() == False
+    artists = list(live.plotter.artists)
+
+    snapshot['floors'] = np.array([[5, 5, 2, 3], [1, 1, 4, 1]], dtype=float)
+    live.update(snapshot)
+    live.draw()
+
+    assert list(live.plotter.artists) == artists
+    assert live.artists[0].polygon.points[2][:2] == [7.0, 8.0]
+
+def test_watch_raises_run_errors(site):
+    with pytest.raises(SystemExit):
+        live_plot.watch(dd, site, WEIGHTS, k=-1)
@@ -0,0 +1,52 @@
+# Tests the streamed import of the site against the DXF document import.
+
+import os
+import ezdxf
+import pytest
+
+import epsap
+
+DXF_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'DXF')
+
+DXF_FILES = ['validation_test.dxf', 'function_debug.dxf']
+
+def boundary_points(boundaries):
+    return {
+        key: [[list(point) for point in x.geometry.points]
+              for x in boundaries[key]]
+        for key in ['building', 'adjacent']
+        }
+
+@pytest.mark.parametrize('filename', DXF_FILES)
+def test_streamed_site_matches_document(filename):
+    filepath = os.path.join(DXF_DIRECTORY, filename)
+    expected = epsap.create_boundaries(filepath)
+    streamed = epsap.create_site_boundaries(epsap.stream_site(filepath))
+
+    assert boundary_points(streamed) == boundary_points(expected)
+
+    for key in ['building', 'adjacent']:
+        for x, y in zip(streamed[key], expected[key]):
+            assert x.width == y.width
+            assert x.height == y.height
+            assert list(x.position) == list(y.position)
+
+def test_buffer_drops_distant_adjacent_polylines(tmp_path):
+    document = ezdxf.new()
+    modelspace = document.modelspace()
+    modelspace.add_lwpolyline([(0, 0), (10, 0), (10, 10), (0, 10)],
+                              close=True, dxfattribs={'layer': 'building'})
+    modelspace.add_lwpolyline([(12, 0), (20, 0), (20, 10), (12, 10)],
+                              close=True, dxfattribs={'layer': 'adjacent'})
+    modelspace.add_lwpolyline([(200, 0), (210, 0), (210, 10), (200, 10)],
+                              close=True, dxfattribs={'layer': 'adjacent'})
+    filepath = str(tmp_path / 'site.dxf')
+    document.saveas(filepath)
+
+    near = epsap.stream_site(filepath, buffer=50.0)
+    assert len(near['adjacent']) == 1
+    assert near['adjacent'][0].min(axis=0).tolist() == [12.0, 0.0]
+
+    far = epsap.stream_site(filepath, buffer=500.0)
+    assert len(far['adjacent']) == 2
@@ -0,0 +1,87 @@
+# Tests the evaluation of spaces assigned to several building boundaries.
+
+import pytest
+
+from compas.geometry import Point, Polygon, Translation
+
+import epsap
+import fitness_functions as ff
+import design_data.first_validation_test as dd
+from space_classes import Boundary, Individual
+
+WEIGHTS = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+@pytest.fixture(scope='module')
+def two_boundaries(site):
+    """
+    Adds a second building boundary, a copy of the validation site building
+    moved away from the adjacent buildings.
+    """
+    building = site['building'][0]
+    moved = building.geometry.transformed(Translation.from_vector([0, -40, 0]))
+
+    return {'building': [building, Boundary(moved)],
+            'adjacent': site['adjacent']}
+
+def split_design_data(m_bnd):
+    design_data = epsap.design_data_namespace(dd)
+    design_data.m_bnd = m_bnd
+
+    return design_data
+
+def test_connectivity_doesnt_depend_on_the_split(two_boundaries):
+    design_data = split_design_data([1, 0, 0, 1, 0, 1, 0, 0, 1])
+
+    for n in range(10):
+        individual = epsap.create_individual('0.01', design_data,
+                                             two_boundaries, WEIGHTS)
+        expected = ff.connectivity_and_adjacency(individual.spaces, dd)
+
+        assert individual.evaluators[0] == pytest.approx(expected)
+        assert individual.fitness_value == pytest.approx(sum([
+            w * e for w, e in zip(WEIGHTS, individual.evaluators)
+            ]))
+
+def test_floor_dimensions_dont_depend_on_the_split(two_boundaries):
+    design_data = split_design_data([1, 0, 0, 1, 0, 1, 0, 0, 1])
+    design_data.m_far = [50.0] * 9
+    unsplit_data = split_design_data([0] * 9)
+    unsplit_data.m_far = design_data.m_far
+
+    for n in range(10):
+        individual = epsap.create_individual('0.01', design_data,
+                                             two_boundaries, WEIGHTS)
+        unsplit = Individual('0.01', individual.spaces)
+        epsap.compute_fitness(unsplit, unsplit_data, two_boundaries, WEIGHTS)
+
+        assert individual.evaluators[3] > 0
+        assert individual.evaluators[3] == pytest.approx(unsplit.evaluators[3])
+
+def test_parallel_evaluation_matches_serial(two_boundaries):
+    design_data = split_design_data([1, 0, 0, 1, 0, 1, 0, 0, 1])
+    individuals = [
+        epsap.create_individual('0.{:02d}'.format(i), design_data,
+                                two_boundaries, WEIGHTS, evaluate=False)
+        for i in range(12)
+        ]
+
+    executor = epsap.create_evaluation_executor(design_data, two_boundaries,
+                                                2)
+    try:
+        epsap.compute_fitness_batch(individuals, design_data, two_boundaries,
+                                    WEIGHTS, executor, batch_size=5)
+    finally:
+        executor.shutdown()
+    parallel = [x.fitness_value for x in individuals]
+
+    epsap.compute_fitness_batch(individuals, design_data, two_boundaries,
+                                WEIGHTS)
+    serial = [x.fitness_value for x in individuals]
+
+    assert parallel == pytest.approx(serial)
+
+def test_boundary_matrix_must_cover_every_space(two_boundaries):
+    design_data = split_design_data([0, 1])
+
+    with pytest.raises(SystemExit):
+        epsap.create_individual('0.01', design_data, two_boundaries, WEIGHTS)
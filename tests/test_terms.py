@@ -0,0 +1,42 @@
+# Tests the incremental terms used by the local search against the full
+# evaluators.
+
+import pytest
+
+import epsap
+import fitness_functions as ff
+import design_data.first_validation_test as dd
+
+WEIGHTS = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_terms_fitness_matches_full_evaluation(site, fixed_point):
+    for i in range(100):
+        individual = epsap.create_individual('0.01', dd, site, WEIGHTS,
+                                             fixed_point, repair=(i % 2 == 1))
+        terms = ff.compute_space_terms(individual.spaces, site, dd)
+
+        assert ff.terms_fitness(terms, site, WEIGHTS) == \
+            pytest.approx(individual.fitness_value, abs=1e-9)
+
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_updated_terms_match_full_evaluation(site, fixed_point):
+    for i in range(30):
+        individual = epsap.create_individual('0.01', dd, site, WEIGHTS,
+                                             fixed_point)
+        spaces = list(individual.spaces)
+        terms = ff.compute_space_terms(spaces, site, dd)
+
+        # Moves every space and updates only its terms
+        for k in range(len(spaces)):
+            moved = epsap.move_space(spaces[k], k % 2, 0.5, dd.m_dim[k])
+            if moved is None:
+                continue
+            spaces[k] = moved
+            ff.update_space_terms(terms, spaces, k, site, dd)
+
+        moved_individual = epsap.Individual('0.01', spaces)
+        moved_individual.compute_fitness_value(site, dd, WEIGHTS)
+
+        assert ff.terms_fitness(terms, site, WEIGHTS) == \
+            pytest.approx(moved_individual.fitness_value, abs=1e-9)
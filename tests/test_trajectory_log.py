@@ -0,0 +1,77 @@
+# Tests the append-only trajectory log.
+
+import pytest
+import numpy as np
+
+import epsap
+import design_data.first_validation_test as dd
+from trajectory_log import TrajectoryLog, read_trajectory
+
+WEIGHTS = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+def append_generation(log, generation, size, value):
+    log.append(generation,
+               np.full((size, 3, 4), value),
+               np.full((size, 2, 5), value),
+               np.full((size, 6), value),
+               np.full(size, value))
+
+def test_read_trajectory_returns_memory_mapped_chunks(tmp_path):
+    log = TrajectoryLog(str(tmp_path))
+    append_generation(log, 0, 4, 0.0)
+    append_generation(log, 1, 2, 1.0)
+    log.close()
+
+    trajectory = read_trajectory(str(tmp_path))
+
+    assert [x['generation'] for x in trajectory] == [0, 1]
+    assert [len(x['fitness']) for x in trajectory] == [4, 2]
+    assert trajectory[0]['floors'].shape == (4, 3, 4)
+    assert isinstance(trajectory[1]['evaluators'], np.memmap)
+    assert (trajectory[1]['openings'] == 1.0).all()
+
+def test_new_log_on_existing_directory_appends(tmp_path):
+    first = TrajectoryLog(str(tmp_path))
+    append_generation(first, 0, 3, 0.0)
+    append_generation(first, 1, 3, 1.0)
+    first.close()
+
+    second = TrajectoryLog(str(tmp_path))
+    append_generation(second, 0, 5, 2.0)
+    second.close()
+
+    trajectory = read_trajectory(str(tmp_path))
+
+    assert [x['generation'] for x in trajectory] == [0, 1, 0]
+    assert [float(x['fitness'][0]) for x in trajectory] == [0.0, 1.0, 2.0]
+    assert len(trajectory[2]['fitness']) == 5
+
+def test_writer_errors_are_raised(tmp_path):
+    path = tmp_path / 'log'
+    log = TrajectoryLog(str(path))
+    path.rmdir()
+
+    append_generation(log, 0, 2, 0.0)
+    log.writer.join(5.0)
+
+    with pytest.raises(FileNotFoundError):
+        append_generation(log, 1, 2, 1.0)
+    with pytest.raises(FileNotFoundError):
+        log.close()
+
+def test_refined_individuals_are_logged(site, tmp_path):
+    population = epsap.create_population(12, 4, dd, site, WEIGHTS)
+    individuals = list(population.individuals)
+
+    log = TrajectoryLog(str(tmp_path))
+    epsap.refine_elite(population, dd, site, WEIGHTS, trajectory=log,
+                       generation=3)
+    log.close()
+
+    refined = [x for x in population.individuals if x not in individuals]
+    trajectory = read_trajectory(str(tmp_path))
+
+    assert len(refined) > 0
+    assert [x['generation'] for x in trajectory] == [3]
+    assert sorted(trajectory[0]['fitness'].tolist()) == \
+        sorted([x.fitness_value for x in refined])
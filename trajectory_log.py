@@ -0,0 +1,154 @@
+# Implements an append-only columnar log of the individuals evaluated by the
+# evolutionary program for space allocation problem proposed by
+# Rodrigues, E. et. al (2013).
+#
+# Every call to 'append' writes one chunk to the log directory, made of one
+# NumPy file per column, named after the chunk number and the generation:
+# - 'floors': (individuals, spaces, 4) array of (x, y, width, height);
+# - 'openings': (individuals, openings, 5) array of (space index, kind, side,
+#   position, size);
+# - 'evaluators': (individuals, 6) array of f1, f2, f3, f5, f6 and f7;
+# - 'fitness': (individuals,) array of fitness values;
+# The chunks are written by a background thread, so the evolution is never
+# blocked by the disk, and can be read back memory-mapped. An error raised
+# while writing stops the writer and is raised again by the next call to
+# 'append' or 'close'. Opening a log on a
+# directory that already has chunks continues their numbering, so earlier
+# chunks are never overwritten.
+#
+# Author: Vinicius Mizobuti
+#
+# Current Version: 1.0.0
+# Release Date: WIP - 03/13/2022
+
+import os
+import queue
+import threading
+import numpy as np
+
+# Columns written on every chunk
+COLUMNS = ['floors', 'openings', 'evaluators', 'fitness']
+
+class TrajectoryLog:
+
+    def __init__(self, path):
+        """
+        Initialize a trajectory log.
+        A trajectory log has:
+        - 'path': the directory where the chunks are written;
+        - 'count': the number of the next chunk to be written;
+        - 'chunks': the queue of chunks waiting to be written;
+        - 'writer': the background thread writing the chunks;
+        - 'error': the error that stopped the writer, if any;
+        """
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+        # Continues after the last chunk already in the directory
+        numbers = [int(x[0]) for x in list_chunks(self.path)]
+        self.count = max(numbers) + 1 if len(numbers) > 0 else 0
+
+        self.chunks = queue.Queue()
+        self.error = None
+        self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+        self.writer.start()
+
+    def append(self, generation, floors, openings, evaluators, fitness):
+        """
+        Queues the arrays of the individuals evaluated in a generation to be
+        written as a new chunk. Returns immediately, or raises the error that
+        stopped the writer.
+        """
+        self.check_writer()
+
+        self.chunks.put((generation, {
+            'floors': np.asarray(floors, dtype=float),
+            'openings': np.asarray(openings, dtype=float),
+            'evaluators': np.asarray(evaluators, dtype=float),
+            'fitness': np.asarray(fitness, dtype=float)
+            }))
+
+        return
+
+    def write_chunks(self):
+        """
+        Writes the queued chunks until None is received. Every column is
+        written to a temporary file first, so readers never see partial
+        chunks. If writing fails, the error is kept and the writer stops.
+        """
+        try:
+            while True:
+                chunk = self.chunks.get()
+                if chunk is None:
+                    break
+
+                # The fitness column is written last, as it marks the chunk
+                # as complete
+                generation, columns = chunk
+                for column in COLUMNS:
+                    filename = "{:06d}_{:06d}_{}.npy".format(self.count, 
+                                                             generation, 
+                                                             column)
+                    temporary = os.path.join(self.path, filename + '.tmp')
+                    with open(temporary, 'wb') as file:
+                        np.save(file, columns[column])
+                    os.replace(temporary, os.path.join(self.path, filename))
+
+                self.count += 1
+        except Exception as error:
+            self.error = error
+
+        return
+
+    def check_writer(self):
+        """
+        Raises the error that stopped the writer, if any.
+        """
+        if self.error is not None:
+            raise self.error
+
+        return
+
+    def close(self):
+        """
+        Waits until all the queued chunks are written, and raises the error
+        that stopped the writer, if any.
+        """
+        self.chunks.put(None)
+        self.writer.join()
+        self.check_writer()
+
+        return
+
+def list_chunks(path):
+    """
+    Lists the complete chunks of a log directory, ordered by chunk number, as
+    (chunk number, generation, file prefix) tuples.
+    """
+    chunks = []
+    for filename in os.listdir(path):
+        if filename.endswith('_fitness.npy'):
+            prefix = filename[:-len('fitness.npy')]
+            number, generation = prefix.split('_')[:2]
+            chunks.append((int(number), int(generation), prefix))
+
+    return sorted(chunks)
+
+def read_trajectory(path, mmap_mode='r'):
+    """
+    Reads a trajectory log back as a list of chunks, in the order they were
+    written. Every chunk is a dictionary with its 'generation' and the NumPy
+    arrays of its columns, which are memory-mapped unless 'mmap_mode' is 
+    None, so the log is never loaded into memory as a whole. The columns of
+    a small log can be joined with np.concatenate.
+    """
+    trajectory = []
+
+    for number, generation, prefix in list_chunks(path):
+        chunk = {'generation': generation}
+        for column in COLUMNS:
+            chunk[column] = np.load(os.path.join(path, prefix + column + 
+                                                 '.npy'), mmap_mode=mmap_mode)
+        trajectory.append(chunk)
+
+    return trajectory